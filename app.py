@@ -1,13 +1,53 @@
 import dash
-from dash import dcc, html, Input, Output
-import boto3
-from botocore.exceptions import ClientError
+from dash import dcc, html, Input, Output, State, Patch, ClientsideFunction, ctx
+import atexit
 import os
-from dotenv import load_dotenv
+import base64
+import codecs
+import tempfile
+import json
+import hmac
+import time
+from functools import partial
+from urllib.parse import parse_qs, quote, urlencode, urlsplit
+from flask import Flask, Response, abort, g, has_request_context, jsonify, request, send_file, send_from_directory, stream_with_context
+from aws_clients import ClientFactory, s3_client_config
+from health import S3ReadinessCheck
+from metrics import Registry, Counter, Histogram, CallbackGauge, CallbackCounter, SIZE_BUCKETS
+from s3_cache import TTLCache, PresignedUrlCache
+from thumbnails import ThumbnailGenerator
+from text_rules import DEFAULT_RULES, RuleSet, load_rules
+from translations import LANGUAGES
+from jobs import Job, JobManager, JobQueueFull, JobStore, make_private_dir
+from batch_api import BatchProcessor, BatchRequestError, iter_ndjson_documents, parse_json_documents
+from bucket_events import ChangeLog, GalleryEventBroker, LocalChangeFeed, SqsChangeFeed, TooManySubscribers
+from key_index import KeyIndex
+from metadata_index import MetadataIndex
+from static_files import HashedStaticFiles
+from fonts import register_font_stylesheets
+from compression import compress_response
+from image_cache import ImageCache, is_not_found
+from profiling import Profiler
 
 
-# Load environment variables
-load_dotenv()
+# Load environment variables from a .env file, searched for from this
+# directory upwards like load_dotenv() does; python-dotenv is only imported
+# when there is one
+def find_env_file(directory):
+    while True:
+        path = os.path.join(directory, '.env')
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+env_file = find_env_file(os.path.dirname(os.path.abspath(__file__)))
+if env_file:
+    from dotenv import load_dotenv
+    load_dotenv(env_file)
 
 
 # AWS configuration (unchanged)
@@ -15,163 +55,243 @@ aws_region = os.getenv('AWS_REGION', 'eu-north-1')
 s3_bucket_name = os.getenv('S3_BUCKET_NAME')
 
 
+# S3 client tuning
+s3_max_pool_connections = int(os.getenv('S3_MAX_POOL_CONNECTIONS', '50'))
+s3_connect_timeout = float(os.getenv('S3_CONNECT_TIMEOUT', '3'))
+s3_read_timeout = float(os.getenv('S3_READ_TIMEOUT', '10'))
+s3_retry_mode = os.getenv('S3_RETRY_MODE', 'adaptive')
+s3_max_attempts = int(os.getenv('S3_MAX_ATTEMPTS', '5'))
+s3_tcp_keepalive = os.getenv('S3_TCP_KEEPALIVE', 'true').lower() in ('1', 'true', 'yes')
+# Optional S3-compatible endpoint, e.g. a local emulator
+s3_endpoint_url = os.getenv('S3_ENDPOINT_URL') or None
+
+
+# S3 readiness check cache lifetimes, in seconds
+s3_ready_ttl = float(os.getenv('S3_READY_TTL', '30'))
+s3_ready_failure_ttl = float(os.getenv('S3_READY_FAILURE_TTL', '5'))
+
+
+# S3 listing cache configuration
+s3_list_cache_ttl = float(os.getenv('S3_LIST_CACHE_TTL', '60'))
+s3_list_cache_maxsize = int(os.getenv('S3_LIST_CACHE_MAXSIZE', '32'))
+s3_folder_cache_maxsize = int(os.getenv('S3_FOLDER_CACHE_MAXSIZE', '256'))
+
+
+# Presigned URL cache configuration
+presign_expires_in = int(os.getenv('PRESIGN_EXPIRES_IN', '3600'))
+presign_refresh_margin = int(os.getenv('PRESIGN_REFRESH_MARGIN', '300'))
+presign_cache_max_bytes = int(os.getenv('PRESIGN_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+
+# Gallery paging configuration
+gallery_page_size = int(os.getenv('GALLERY_PAGE_SIZE', '24'))
+gallery_auto_refresh_seconds = float(os.getenv('GALLERY_AUTO_REFRESH_SECONDS', '0'))
+
+
+# Gallery navigation - folders split keys on GALLERY_DELIMITER (empty for a
+# flat gallery); search results are capped at GALLERY_SEARCH_LIMIT keys
+gallery_delimiter = os.getenv('GALLERY_DELIMITER', '/')
+gallery_search_limit = int(os.getenv('GALLERY_SEARCH_LIMIT', '1000'))
+
+
+# Gallery metadata index - 'memory' (cached listings) or 'sqlite' (persistent,
+# synced in the background every GALLERY_INDEX_SYNC_INTERVAL seconds)
+gallery_index_mode = os.getenv('GALLERY_INDEX', 'memory')
+gallery_index_path = os.getenv('GALLERY_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.gallery-index.sqlite3'))
+gallery_index_sync_interval = float(os.getenv('GALLERY_INDEX_SYNC_INTERVAL', '300'))
+gallery_index_probe = os.getenv('GALLERY_INDEX_PROBE', 'true').lower() in ('1', 'true', 'yes')
+
+
+# Background gallery job configuration
+gallery_job_workers = int(os.getenv('GALLERY_JOB_WORKERS', '4'))
+gallery_job_max_pending = int(os.getenv('GALLERY_JOB_MAX_PENDING', '64'))
+gallery_job_retention = int(os.getenv('GALLERY_JOB_RETENTION', '300'))
+
+
+# Background job state is kept on local disk so any worker process can
+# answer a poll for a job another one runs; the directory must belong to the
+# user the app runs as
+job_store_dir = os.getenv('JOB_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.jobs'))
+
+
+# Gallery image URLs - 'presigned' (browsers fetch from S3 directly) or
+# 'proxy' (stable /images/<key> URLs served through a local disk cache)
+gallery_image_mode = os.getenv('GALLERY_IMAGE_MODE', 'presigned')
+image_cache_dir = os.getenv('IMAGE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.image-cache'))
+image_cache_max_bytes = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+image_cache_max_object_bytes = int(os.getenv('IMAGE_CACHE_MAX_OBJECT_BYTES', str(32 * 1024 * 1024)))
+image_cache_ttl = float(os.getenv('IMAGE_CACHE_TTL', '300'))
+image_proxy_max_age = int(os.getenv('IMAGE_PROXY_MAX_AGE', '3600'))
+
+
+# Thumbnail configuration - mode is 'off', 's3' or 'local'
+thumbnail_mode = os.getenv('THUMBNAIL_MODE', 'off')
+thumbnail_prefix = os.getenv('THUMBNAIL_PREFIX', '_thumbnails/')
+thumbnail_cache_dir = os.getenv('THUMBNAIL_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.thumbnails'))
+thumbnail_width = int(os.getenv('THUMBNAIL_WIDTH', '560'))
+thumbnail_height = int(os.getenv('THUMBNAIL_HEIGHT', '400'))
+thumbnail_workers = int(os.getenv('THUMBNAIL_WORKERS', '4'))
+thumbnail_retry_seconds = float(os.getenv('THUMBNAIL_RETRY_SECONDS', '300'))
+
+
+# Bucket change feed configuration - mode is 'off', 'sqs' or 'local' (event
+# files dropped into GALLERY_EVENTS_DIR, for development and tests). One
+# process per host reads the feed into GALLERY_EVENTS_LOG_PATH and every
+# worker process follows that log; several hosts need a queue each (e.g. SNS
+# fan-out).
+gallery_events_mode = os.getenv('GALLERY_EVENTS_MODE', 'off')
+gallery_events_queue_url = os.getenv('GALLERY_EVENTS_QUEUE_URL')
+gallery_events_dir = os.getenv('GALLERY_EVENTS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.gallery-events'))
+gallery_events_log_path = os.getenv('GALLERY_EVENTS_LOG_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.gallery-events.sqlite3'))
+gallery_events_enabled = (gallery_events_mode == 'sqs' and bool(gallery_events_queue_url)) or gallery_events_mode == 'local'
+
+
+# Each open event stream holds one of the SERVER_THREADS threads of a worker
+# process (gunicorn --threads), so at most GALLERY_EVENTS_MAX_SUBSCRIBERS
+# (never more than half of them) are served at once, each closed after
+# GALLERY_EVENTS_MAX_STREAM_SECONDS (browsers reconnect)
+server_threads = int(os.getenv('SERVER_THREADS', '8'))
+gallery_events_max_subscribers = min(
+    int(os.getenv('GALLERY_EVENTS_MAX_SUBSCRIBERS', str(max(server_threads // 4, 1)))),
+    max(server_threads // 2, 1)
+)
+gallery_events_max_stream_seconds = float(os.getenv('GALLERY_EVENTS_MAX_STREAM_SECONDS', '300'))
+
+
+# Text processing rules - TEXT_RULES_FILE points to a JSON rule file
+text_rules_file = os.getenv('TEXT_RULES_FILE')
+
+
+# Text processing trigger - 'submit' (on click only), 'debounce' (live after
+# the first click, once typing pauses) or 'clientside' (in the browser)
+process_trigger_mode = os.getenv('PROCESS_TRIGGER_MODE', 'debounce')
+process_debounce_ms = int(os.getenv('PROCESS_DEBOUNCE_MS', '400'))
+
+
+# Batch API configuration - BATCH_WORKERS=0 processes in the request thread
+batch_workers = int(os.getenv('BATCH_WORKERS', str(os.cpu_count() or 1)))
+batch_chunk_size = int(os.getenv('BATCH_CHUNK_SIZE', '64'))
+batch_max_inflight = int(os.getenv('BATCH_MAX_INFLIGHT', str(2 * max(batch_workers, 1))))
+batch_max_documents = int(os.getenv('BATCH_MAX_DOCUMENTS', '10000'))
+batch_max_bytes = int(os.getenv('BATCH_MAX_BYTES', str(32 * 1024 * 1024)))
+
+
+# Large file processing configuration
+text_upload_max_bytes = int(os.getenv('TEXT_UPLOAD_MAX_BYTES', str(50 * 1024 * 1024)))
+text_stream_chunk_size = int(os.getenv('TEXT_STREAM_CHUNK_SIZE', str(1024 * 1024)))
+text_stream_dir = os.getenv('TEXT_STREAM_DIR', os.path.join(tempfile.gettempdir(), 'text-processor'))
+text_stream_workers = int(os.getenv('TEXT_STREAM_WORKERS', '2'))
+text_stream_retention = int(os.getenv('TEXT_STREAM_RETENTION', '3600'))
+
+
+# Profiling - PROFILE_MODE ('off', 'sampling' or 'deterministic') profiles
+# every callback and gallery job; PROFILE_SLOW_MS samples those still running
+# after that long (0 = off). A request sent with X-Profile: <mode> and
+# X-Profile-Token: $PROFILE_TOKEN is profiled on demand.
+profile_mode = os.getenv('PROFILE_MODE', 'off')
+profile_slow_ms = float(os.getenv('PROFILE_SLOW_MS', '0'))
+profile_token = os.getenv('PROFILE_TOKEN') or None
+profile_dir = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'text-processor-profiles'))
+profile_interval_ms = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+profile_retention = int(os.getenv('PROFILE_RETENTION', '50'))
+
+
+# Static files and response compression
+static_dir = os.getenv('STATIC_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+compress_responses = os.getenv('COMPRESS_RESPONSES', 'true').lower() in ('1', 'true', 'yes')
+
+
 # Debug prints (unchanged)
 print(f"DEBUG: AWS_REGION = {aws_region}")
 print(f"DEBUG: S3_BUCKET_NAME = {s3_bucket_name}")
 
 
-# S3 client initialization (unchanged)
-s3_client = None
-try:
-    s3_client = boto3.client('s3', region_name=aws_region)
-    print("DEBUG: S3 client created successfully")
-    
-    if s3_bucket_name:
-        try:
-            s3_client.head_bucket(Bucket=s3_bucket_name)
-            print(f"DEBUG: Successfully connected to bucket '{s3_bucket_name}'")
-        except ClientError as e:
-            error_code = e.response.get('Error', {}).get('Code', '')
-            if error_code == '404':
-                print(f"ERROR: Bucket '{s3_bucket_name}' not found")
-            elif error_code == '403':
-                print(f"ERROR: Access denied to bucket '{s3_bucket_name}'. Check IAM role permissions.")
-            else:
-                print(f"ERROR: {e}")
-    else:
-        print("WARNING: S3_BUCKET_NAME not set in .env file")
-except Exception as e:
-    print(f"ERROR: Failed to initialize S3 client: {e}")
-    print(f"ERROR: Exception type: {type(e).__name__}")
-    import traceback
-    traceback.print_exc()
-    s3_client = None
-
-
-# 10-language dictionary (no Hebrew)
-LANGUAGES = {
-    'en': {
-        'title': 'Text Processor',
-        'input_label': 'Enter text:',
-        'input_placeholder': 'Type your text here...',
-        'process_button': 'Process',
-        'output_label': 'Processed Text:',
-        'gallery_title': 'S3 Bucket Images:',
-        'no_s3_config': 'Please configure S3_BUCKET_NAME in .env file. Ensure EC2 instance has S3 permissions.',
-        'no_images': 'No images found in the S3 bucket.',
-        'output_placeholder': 'Processing results will appear here.'
-    },
-    'ja': {
-        'title': 'テキストプロセッサ',
-        'input_label': 'テキストを入力:',
-        'input_placeholder': 'ここにテキストを入力してください...',
-        'process_button': '処理',
-        'output_label': '処理済みテキスト:',
-        'gallery_title': 'S3 バケット画像:',
-        'no_s3_config': 'S3_BUCKET_NAME を .env ファイルに設定してください。EC2 インスタンスに S3 パーミッションがあることを確認してください。',
-        'no_images': 'S3 バケットに画像が見つかりません。',
-        'output_placeholder': '処理結果がここに表示されます。'
-    },
-    'zh': {
-        'title': '文本处理器',
-        'input_label': '输入文本：',
-        'input_placeholder': '在这里输入您的文本...',
-        'process_button': '处理',
-        'output_label': '处理后的文本：',
-        'gallery_title': 'S3 存储桶图片：',
-        'no_s3_config': '请在 .env 文件中配置 S3_BUCKET_NAME。确保 EC2 实例具有 S3 权限。',
-        'no_images': 'S3 存储桶中未找到图片。',
-        'output_placeholder': '处理结果将显示在这里。'
-    },
-    'fr': {
-        'title': 'Processeur de texte',
-        'input_label': 'Entrez du texte :',
-        'input_placeholder': 'Tapez votre texte ici...',
-        'process_button': 'Traiter',
-        'output_label': 'Texte traité :',
-        'gallery_title': 'Images du bucket S3 :',
-        'no_s3_config': 'Veuillez configurer S3_BUCKET_NAME dans le fichier .env. Assurez-vous que l\'instance EC2 a les permissions S3.',
-        'no_images': 'Aucune image trouvée dans le bucket S3.',
-        'output_placeholder': 'Les résultats du traitement apparaîtront ici.'
-    },
-    'pt-BR': {
-        'title': 'Processador de Texto',
-        'input_label': 'Digite o texto:',
-        'input_placeholder': 'Digite seu texto aqui...',
-        'process_button': 'Processar',
-        'output_label': 'Texto Processado:',
-        'gallery_title': 'Imagens do Bucket S3:',
-        'no_s3_config': 'Configure S3_BUCKET_NAME no arquivo .env. Certifique-se de que a instância EC2 tem permissões S3.',
-        'no_images': 'Nenhuma imagem encontrada no bucket S3.',
-        'output_placeholder': 'Os resultados do processamento aparecerão aqui.'
-    },
-    'it': {
-        'title': 'Processore di Testo',
-        'input_label': 'Inserisci testo:',
-        'input_placeholder': 'Digita il tuo testo qui...',
-        'process_button': 'Elabora',
-        'output_label': 'Testo Elaborato:',
-        'gallery_title': 'Immagini Bucket S3:',
-        'no_s3_config': 'Configura S3_BUCKET_NAME nel file .env. Assicurati che l\'istanza EC2 abbia i permessi S3.',
-        'no_images': 'Nessuna immagine trovata nel bucket S3.',
-        'output_placeholder': 'I risultati dell\'elaborazione appariranno qui.'
-    },
-    'ru': {
-        'title': 'Обработчик текста',
-        'input_label': 'Введите текст:',
-        'input_placeholder': 'Введите ваш текст здесь...',
-        'process_button': 'Обработать',
-        'output_label': 'Обработанный текст:',
-        'gallery_title': 'Изображения из S3 бакета:',
-        'no_s3_config': 'Настройте S3_BUCKET_NAME в файле .env. Убедитесь, что EC2 имеет права доступа к S3.',
-        'no_images': 'Изображения в S3 бакете не найдены.',
-        'output_placeholder': 'Результаты обработки появятся здесь.'
-    },
-    'el': {
-        'title': 'Επεξεργαστής Κειμένου',
-        'input_label': 'Εισαγάγετε κείμενο:',
-        'input_placeholder': 'Πληκτρολογήστε το κείμενό σας εδώ...',
-        'process_button': 'Επεξεργασία',
-        'output_label': 'Επεξεργασμένο Κείμενο:',
-        'gallery_title': 'Εικόνες S3 Bucket:',
-        'no_s3_config': 'Ρυθμίστε το S3_BUCKET_NAME στο αρχείο .env. Βεβαιωθείτε ότι η EC2 έχει δικαιώματα S3.',
-        'no_images': 'Δεν βρέθηκαν εικόνες στο S3 bucket.',
-        'output_placeholder': 'Τα αποτελέσματα επεξεργασίας θα εμφανιστούν εδώ.'
-    },
-    'ar': {
-        'title': 'معالج النصوص',
-        'input_label': 'أدخل النص:',
-        'input_placeholder': 'اكتب نصك هنا...',
-        'process_button': 'معالجة',
-        'output_label': 'النص المعالج:',
-        'gallery_title': 'صور حاوية S3:',
-        'no_s3_config': 'يرجى تكوين S3_BUCKET_NAME في ملف .env. تأكد من أن مثيل EC2 لديه أذونات S3.',
-        'no_images': 'لم يتم العثور على صور في حاوية S3.',
-        'output_placeholder': 'ستظهر نتائج المعالجة هنا.'
-    },
-    'tl': {
-        'title': 'Text Processor',
-        'input_label': 'Ilagay ang teksto:',
-        'input_placeholder': 'I-type ang iyong teksto dito...',
-        'process_button': 'Proseso',
-        'output_label': 'Na-process na Teksto:',
-        'gallery_title': 'Mga Larawan ng S3 Bucket:',
-        'no_s3_config': 'I-configure ang S3_BUCKET_NAME sa .env file. Siguraduhin na ang EC2 instance ay may S3 permissions.',
-        'no_images': 'Walang natagpuang mga larawan sa S3 bucket.',
-        'output_placeholder': 'Dito lalabas ang mga resulta ng pagproseso.'
-    },
-    'es': {
-        'title': 'Procesador de Texto',
-        'input_label': 'Ingresa texto:',
-        'input_placeholder': 'Escribe tu texto aquí...',
-        'process_button': 'Procesar',
-        'output_label': 'Texto Procesado:',
-        'gallery_title': 'Imágenes del Bucket S3:',
-        'no_s3_config': 'Configura S3_BUCKET_NAME en el archivo .env. Asegúrate de que la instancia EC2 tenga permisos S3.',
-        'no_images': 'No se encontraron imágenes en el bucket S3.',
-        'output_placeholder': 'Los resultados del procesamiento aparecerán aquí.'
-    }
-}
+# Profiles are written to PROFILE_DIR as flamegraph input
+profiler = Profiler(
+    profile_dir,
+    mode=profile_mode,
+    slow_seconds=profile_slow_ms / 1000,
+    interval=profile_interval_ms / 1000,
+    retention=profile_retention,
+    token=profile_token
+)
+
+
+# Metrics, exposed in Prometheus text format on /metrics
+metrics_registry = Registry()
+callback_duration = metrics_registry.register(Histogram(
+    'dash_callback_duration_seconds', 'Server-side Dash callback latency', ['callback']))
+callback_request_bytes = metrics_registry.register(Histogram(
+    'dash_callback_request_bytes', 'Dash callback request payload size', ['callback'], SIZE_BUCKETS))
+callback_response_bytes = metrics_registry.register(Histogram(
+    'dash_callback_response_bytes', 'Dash callback response payload size', ['callback'], SIZE_BUCKETS))
+s3_operations = metrics_registry.register(Counter(
+    's3_operations_total', 'S3 API calls by operation and outcome', ['operation', 'outcome']))
+s3_operation_duration = metrics_registry.register(Histogram(
+    's3_operation_duration_seconds', 'S3 API call latency, including retries', ['operation']))
+job_duration = metrics_registry.register(Histogram(
+    'background_job_duration_seconds', 'Background job run time', ['job']))
+
+
+def record_s3_call_start(context, **kwargs):
+    context['metrics_started'] = time.perf_counter()
+
+
+# after-call-error (connection failures) carries no operation model, only
+# the event name ('after-call-error.s3.ListObjectsV2')
+def record_s3_call_end(context, event_name, model=None, parsed=None, exception=None, **kwargs):
+    operation = model.name if model is not None else event_name.rsplit('.', 1)[-1]
+    started = context.pop('metrics_started', None)
+    if started is not None:
+        s3_operation_duration.observe(time.perf_counter() - started, operation=operation)
+    failed = exception is not None or (isinstance(parsed, dict) and 'Error' in parsed)
+    s3_operations.inc(operation=operation, outcome='error' if failed else 'ok')
+
+
+def record_presign(seconds):
+    s3_operation_duration.observe(seconds, operation='GeneratePresignedUrl')
+    s3_operations.inc(operation='GeneratePresignedUrl', outcome='ok')
+
+
+def instrument_s3_client(client):
+    events = client.meta.events
+    events.register('before-call.s3', record_s3_call_start, unique_id='metrics-start')
+    events.register('after-call.s3', record_s3_call_end, unique_id='metrics-end')
+    events.register('after-call-error.s3', record_s3_call_end, unique_id='metrics-error')
+
+
+# One shared, tuned S3 client per process; re-created after a fork
+s3_client_factory = ClientFactory('s3', partial(
+    s3_client_config,
+    region=aws_region,
+    max_pool_connections=s3_max_pool_connections,
+    connect_timeout=s3_connect_timeout,
+    read_timeout=s3_read_timeout,
+    retry_mode=s3_retry_mode,
+    max_attempts=s3_max_attempts,
+    tcp_keepalive=s3_tcp_keepalive
+), on_create=instrument_s3_client, endpoint_url=s3_endpoint_url)
+
+
+def get_s3_client():
+    try:
+        return s3_client_factory.get()
+    except Exception as e:
+        print(f"ERROR: Failed to initialize S3 client: {e}")
+        return None
+
+
+# S3 connectivity is checked lazily in the background; see /readyz
+s3_readiness = S3ReadinessCheck(
+    get_client=get_s3_client,
+    bucket=s3_bucket_name,
+    ttl=s3_ready_ttl,
+    failure_ttl=s3_ready_failure_ttl
+)
+
+
+# RTL only for Arabic
+RTL_LANGUAGES = ['ar']
 
 
 # Language options for dropdown
@@ -190,19 +310,36 @@ LANGUAGE_OPTIONS = [
 ]
 
 
-# Initialize Dash app with comprehensive font support
+# Content-hashed static files (stylesheets, fonts), cached for a year by browsers
+static_files = HashedStaticFiles(static_dir, '/static')
+
+
+# Self-hosted fonts - one stylesheet per language declaring only its own subset
+font_stylesheets = register_font_stylesheets(static_files)
+default_language = 'en'
+
+
 external_stylesheets = [
-    {
-        'href': 'https://fonts.googleapis.com/css2?family=Noto+Sans+JP:wght@300;400;500&family=Noto+Sans+SC:wght@300;400;500&family=Inter:wght@300;400;500&family=Noto+Sans:wght@300;400;500&family=Noto+Sans+Arabic:wght@300;400;500&display=swap',
-        'rel': 'stylesheet'
-    }
+    {'href': static_files.url('css/app.css'), 'rel': 'stylesheet'}
 ]
 
 
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
+# Flask's own /static route is disabled; static_files serves that path
+app = dash.Dash(
+    __name__,
+    server=Flask(__name__, static_folder=None),
+    external_stylesheets=external_stylesheets
+)
+
+
+# Preload the default language's font so first paint does not wait on it
+default_font_css, default_font_file = font_stylesheets[default_language]
+font_preload_links = f'<link rel="preload" href="{default_font_css}" as="style">'
+if default_font_file:
+    font_preload_links += f'<link rel="preload" href="{default_font_file}" as="font" type="font/woff2" crossorigin>'
 
 
-# FIXED styles with proper z-index for dropdown
+# Page shell - styles live in static/css/app.css
 app.index_string = '''
 <!DOCTYPE html>
 <html>
@@ -210,285 +347,8 @@ app.index_string = '''
         {%metas%}
         <title>Text Processor</title>
         {%favicon%}
+        {font_preload}
         {%css%}
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: 'Inter', 'Noto Sans JP', 'Noto Sans SC', 'Noto Sans', 'Noto Sans Arabic', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-                min-height: 100vh;
-                color: #2d3748;
-                line-height: 1.6;
-                letter-spacing: 0.5px;
-                direction: ltr;
-            }
-            
-            body.rtl {
-                direction: rtl;
-            }
-            
-            .container {
-                max-width: 900px;
-                margin: 0 auto;
-                padding: 60px 20px;
-                position: relative;
-                z-index: 1;
-            }
-            
-            .header-controls {
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                margin-bottom: 40px;
-                gap: 20px;
-            }
-            
-            .title {
-                font-size: 2.5rem;
-                font-weight: 300;
-                text-align: center;
-                margin: 0;
-                color: #1a202c;
-                letter-spacing: 2px;
-                position: relative;
-                flex: 1;
-            }
-            
-            .title::after {
-                content: '';
-                display: block;
-                width: 60px;
-                height: 2px;
-                background: linear-gradient(90deg, #4299e1, #63b3ed);
-                margin: 20px auto 0;
-                border-radius: 1px;
-            }
-            
-            .lang-dropdown {
-                background: rgba(255, 255, 255, 0.9);
-                backdrop-filter: blur(10px);
-                border: 1px solid rgba(255, 255, 255, 0.3);
-                border-radius: 12px;
-                padding: 8px 16px;
-                font-size: 1rem;
-                font-weight: 500;
-                color: #2d3748;
-                box-shadow: 0 5px 15px rgba(0, 0, 0, 0.08);
-                min-width: 200px;
-                z-index: 1000;
-                position: relative;
-            }
-            
-            .lang-dropdown .Select-control {
-                border-radius: 8px !important;
-                background: white !important;
-                border: 2px solid #e2e8f0 !important;
-                z-index: 1001 !important;
-                box-shadow: 0 10px 30px rgba(0, 0, 0, 0.15) !important;
-            }
-            
-            .lang-dropdown .Select-menu-outer {
-                z-index: 1002 !important;
-                border-radius: 12px !important;
-                box-shadow: 0 20px 40px rgba(0, 0, 0, 0.2) !important;
-                border: 1px solid rgba(66, 153, 225, 0.2) !important;
-                background: white !important;
-                margin-top: 4px !important;
-                max-height: 300px !important;
-                overflow: auto !important;
-            }
-            
-            .lang-dropdown:hover .Select-control {
-                border-color: #4299e1 !important;
-                box-shadow: 0 0 0 3px rgba(66, 153, 225, 0.1), 0 10px 30px rgba(0, 0, 0, 0.15) !important;
-            }
-            
-            .input-section, .output-section {
-                background: rgba(255, 255, 255, 0.85);
-                backdrop-filter: blur(10px);
-                border: 1px solid rgba(255, 255, 255, 0.2);
-                border-radius: 20px;
-                padding: 40px;
-                margin-bottom: 40px;
-                box-shadow: 0 20px 40px rgba(0, 0, 0, 0.05);
-                transition: all 0.3s ease;
-                z-index: 10;
-            }
-            
-            .input-section:hover, .output-section:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 25px 50px rgba(0, 0, 0, 0.08);
-            }
-            
-            .label {
-                font-size: 1.1rem; 
-                font-weight: 400;
-                margin-bottom: 20px;
-                color: #2d3748;
-                display: block;
-            }
-            
-            .textarea {
-                width: 100%;
-                min-height: 160px;
-                padding: 24px;
-                font-size: 16px;
-                line-height: 1.7;
-                border: 2px solid #e2e8f0;
-                border-radius: 12px;
-                background: rgba(255, 255, 255, 0.9);
-                font-family: inherit;
-                resize: vertical;
-                transition: all 0.3s ease;
-                color: #2d3748;
-                direction: inherit;
-            }
-            
-            .textarea:focus {
-                outline: none;
-                border-color: #4299e1;
-                box-shadow: 0 0 0 3px rgba(66, 153, 225, 0.1);
-                background: white;
-            }
-            
-            .process-btn {
-                display: block;
-                width: 200px;
-                margin: 30px auto 0;
-                padding: 16px 40px;
-                font-size: 1.1rem;
-                font-weight: 500;
-                color: white;
-                background: linear-gradient(135deg, #4299e1 0%, #3182ce 100%);
-                border: none;
-                border-radius: 50px;
-                cursor: pointer;
-                transition: all 0.3s ease;
-                box-shadow: 0 10px 25px rgba(66, 153, 225, 0.3);
-                letter-spacing: 1px;
-            }
-            
-            .process-btn:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 15px 35px rgba(66, 153, 225, 0.4);
-                background: linear-gradient(135deg, #3182ce 0%, #2b6cb0 100%);
-            }
-            
-            .process-btn:active {
-                transform: translateY(0);
-            }
-            
-            .output-content {
-                min-height: 120px;
-                padding: 30px;
-                background: linear-gradient(135deg, rgba(255,255,255,0.7) 0%, rgba(248,250,252,0.7) 100%);
-                border-radius: 16px;
-                border: 1px solid rgba(226, 232, 240, 0.5);
-                font-size: 18px;
-                line-height: 1.8;
-                color: #2d3748;
-                white-space: pre-wrap;
-                font-family: inherit;
-                letter-spacing: 0.8px;
-                backdrop-filter: blur(10px);
-                direction: inherit;
-            }
-            
-            .gallery-section {
-                background: rgba(255, 255, 255, 0.85);
-                backdrop-filter: blur(10px);
-                border: 1px solid rgba(255, 255, 255, 0.2);
-                border-radius: 20px;
-                padding: 40px;
-                box-shadow: 0 20px 40px rgba(0, 0, 0, 0.05);
-            }
-            
-            .gallery-title {
-                font-size: 1.4rem;
-                font-weight: 400;
-                margin-bottom: 30px;
-                color: #2d3748;
-                text-align: center;
-                letter-spacing: 1px;
-            }
-            
-            .gallery {
-                display: flex;
-                flex-wrap: wrap;
-                gap: 25px;
-                justify-content: center;
-            }
-            
-            .gallery-item {
-                flex: 0 1 280px;
-                background: white;
-                border-radius: 16px;
-                padding: 20px;
-                box-shadow: 0 10px 30px rgba(0, 0, 0, 0.1);
-                transition: all 0.3s ease;
-                text-align: center;
-            }
-            
-            .gallery-item:hover {
-                transform: translateY(-5px);
-                box-shadow: 0 20px 40px rgba(0, 0, 0, 0.15);
-            }
-            
-            .gallery-img {
-                width: 100%;
-                height: 200px;
-                object-fit: cover;
-                border-radius: 12px;
-                margin-bottom: 15px;
-            }
-            
-            .gallery-filename {
-                font-size: 0.9rem;
-                color: #718096;
-                word-break: break-all;
-                line-height: 1.4;
-                direction: ltr;
-            }
-            
-            .empty-state {
-                text-align: center;
-                padding: 60px 20px;
-                color: #a0aec0;
-                font-size: 1.1rem;
-                letter-spacing: 0.5px;
-            }
-            
-            @media (max-width: 768px) {
-                .container {
-                    padding: 40px 15px;
-                }
-                
-                .header-controls {
-                    flex-direction: column;
-                    gap: 20px;
-                    text-align: center;
-                }
-                
-                .title {
-                    font-size: 2rem;
-                    margin-bottom: 0;
-                }
-                
-                .input-section, .output-section, .gallery-section {
-                    padding: 30px 20px;
-                }
-                
-                .gallery-item {
-                    flex: 0 1 100%;
-                    max-width: 350px;
-                }
-            }
-        </style>
     </head>
     <body>
         {%app_entry%}
@@ -499,162 +359,1311 @@ app.index_string = '''
         </footer>
     </body>
 </html>
-'''
-
-
-# Updated layout with language dropdown
-app.layout = html.Div(className="container", children=[
-    html.Div(className="header-controls", children=[
-        html.H1(id='app-title', className="title"),
-        dcc.Dropdown(
-            id='lang-dropdown',
-            options=LANGUAGE_OPTIONS,
-            value='en',  # Default English
-            clearable=False,
-            className='lang-dropdown'
+'''.replace('{font_preload}', font_preload_links)
+
+
+# Rules are compiled once into a single-pass transformer
+text_rule_set = RuleSet(load_rules(text_rules_file) if text_rules_file else DEFAULT_RULES)
+
+
+# Accept-Language tag (lowercase, with or without region) -> catalog language
+LANGUAGE_TAGS = {code.split('-')[0].lower(): code for code in LANGUAGES}
+LANGUAGE_TAGS.update({code.lower(): code for code in LANGUAGES})
+
+
+# Language of a server-rendered page: the one picked last time (the lang
+# cookie set by i18n.update_language), else the browser's preference
+def request_language():
+    if not has_request_context():
+        return default_language
+    lang = request.cookies.get('lang')
+    if lang in LANGUAGES:
+        return lang
+    # Highest quality first; a region we have no catalog for falls back to
+    # the base language (pt-PT -> pt-BR, zh-TW -> zh)
+    for value, _ in request.accept_languages:
+        value = value.lower()
+        lang = LANGUAGE_TAGS.get(value) or LANGUAGE_TAGS.get(value.split('-')[0])
+        if lang:
+            return lang
+    return default_language
+
+
+# Text from the catalog, tagged with its key so a language switch can
+# relabel it in the browser (i18n.relabel) without asking the server
+def localized_text(key, selected_lang, component=html.Span, **props):
+    return component(LANGUAGES[selected_lang][key], **{'data-i18n': key}, **props)
+
+
+# The layout is fetched by the page itself, so its Referer is the page URL.
+# Dash also builds the layout outside of that request (validation, first
+# request setup); those get no gallery snapshot.
+def layout_page_url():
+    if not has_request_context() or not request.path.endswith('/_dash-layout'):
+        return None
+    url = urlsplit(request.referrer or '')
+    if url.netloc != request.host:
+        url = urlsplit(request.host_url)
+    return url
+
+
+# Whether the first gallery page can be rendered without calling S3
+def gallery_listing_cached(prefix):
+    if not s3_bucket_name or get_s3_client() is None:
+        return True
+    if metadata_index is not None and metadata_index.synced_at(s3_bucket_name) is not None:
+        return True
+    if not gallery_delimiter:
+        return s3_list_cache.get(s3_bucket_name) is not None
+    return s3_folder_cache.get((s3_bucket_name, prefix)) is not None
+
+
+def idle_gallery():
+    hidden = {'display': 'none'}
+    return {
+        'children': None, 'cursor': 0, 'more_style': hidden, 'job': None,
+        'poll_disabled': True, 'status': None, 'status_style': hidden
+    }
+
+
+# Gallery state for the layout. When the listing is cached and thumbnail
+# lookups need no LIST, the first page is rendered in place (URL signing is
+# local and cached). Otherwise it is built on the job pool and the page polls
+# for it, the same as after display_s3_images; layout requests for the same
+# folder and language share one job.
+def initial_gallery(prefix, selected_lang):
+    state = idle_gallery()
+    if gallery_listing_cached(prefix) and thumbnail_generator.ready_known(s3_bucket_name):
+        state['children'], state['cursor'], state['more_style'] = build_gallery_page(
+            Job(), 0, gallery_page_size, selected_lang, prefix, '', 'name'
         )
-    ]),
-    
-    html.Div(id='input-section', className="input-section", children=[
-        html.Label(id='input-label', className="label"),
-        dcc.Textarea(
-            id='input-text',
-            className='textarea'
-        ),
-        html.Button(id='process-button', n_clicks=0, className='process-btn')
-    ]),
+        return state
+    try:
+        job = gallery_jobs.submit_shared(
+            ('layout', prefix, selected_lang),
+            build_gallery_page, 0, gallery_page_size, selected_lang, prefix, '', 'name'
+        )
+    except JobQueueFull:
+        state['status'], state['status_style'] = localized_text('gallery_busy', selected_lang), {}
+        return state
+    state['job'] = {'id': job.id, 'load_more': False, 'shared': True}
+    state['poll_disabled'] = False
+    state['status'], state['status_style'] = localized_text('gallery_loading', selected_lang), {}
+    return state
+
+
+def sort_options(texts):
+    return [
+        {'label': texts['sort_name'], 'value': 'name'},
+        {'label': texts['sort_newest'], 'value': 'newest'},
+        {'label': texts['sort_largest'], 'value': 'largest'}
+    ]
+
+
+# Layout, built per request in the visitor's language with the gallery
+# already filled in, so the page needs no initial callbacks: everything
+# update_language, process_text and display_s3_images would return on load
+# is part of the layout.
+def serve_layout():
+    lang = request_language()
+    texts = LANGUAGES[lang]
+    rtl_class = ' rtl' if lang in RTL_LANGUAGES else ''
     
-    html.Div(id='output-section', className="output-section", children=[
-        html.Div(id='output-text', className='output-content')
-    ]),
+    page_url = layout_page_url()
+    prefix = gallery_prefix(page_url.query) if page_url else ''
+    gallery = initial_gallery(prefix, lang) if page_url else idle_gallery()
+    # Matching the page URL keeps dcc.Location from reporting it as a change
+    location = {
+        'href': page_url.geturl(),
+        'pathname': page_url.path,
+        'search': '?' + page_url.query if page_url.query else '',
+        'hash': ''
+    } if page_url else {}
     
-    html.Div(className="gallery-section", children=[
-        html.H3(id='gallery-title', className="gallery-title"),
-        html.Div(id='s3-images')
+    return html.Div(className="container", children=[
+        # Localization catalog, shipped once with the layout
+        dcc.Store(id='i18n-catalog', data={
+            'texts': LANGUAGES,
+            'rtl': RTL_LANGUAGES,
+            'fonts': {code: urls[0] for code, urls in font_stylesheets.items()}
+        }),
+        html.Link(id='font-stylesheet', rel='stylesheet', href=font_stylesheets[lang][0]),
+        
+        html.Div(className="header-controls", children=[
+            html.H1(texts['title'], id='app-title', className="title"),
+            dcc.Dropdown(
+                id='lang-dropdown',
+                options=LANGUAGE_OPTIONS,
+                value=lang,
+                clearable=False,
+                className='lang-dropdown'
+            )
+        ]),
+        
+        html.Div(id='input-section', className="input-section" + rtl_class, children=[
+            html.Label(texts['input_label'], id='input-label', className="label"),
+            dcc.Textarea(
+                id='input-text',
+                className='textarea',
+                placeholder=texts['input_placeholder'],
+                dir='rtl' if rtl_class else 'ltr'
+            ),
+            html.Button(texts['process_button'], id='process-button', n_clicks=0, className='process-btn'),
+            dcc.Interval(id='process-debounce', interval=process_debounce_ms, max_intervals=0),
+            dcc.Store(
+                id='text-rules',
+                data=text_rule_set.rules if process_trigger_mode == 'clientside' else None
+            ),
+            html.Label(texts['upload_label'], id='upload-label', className="label upload-label"),
+            dcc.Upload(
+                id='upload-text',
+                className='upload-area',
+                max_size=text_upload_max_bytes,
+                children=html.Div(texts['upload_prompt'], id='upload-prompt')
+            ),
+            html.Div(id='upload-status', className='upload-status'),
+            dcc.Store(id='upload-job'),
+            dcc.Interval(id='upload-interval', interval=500, disabled=True)
+        ]),
+        
+        html.Div(id='output-section', className="output-section" + rtl_class, children=[
+            html.Div(
+                localized_text('output_placeholder', lang),
+                id='output-text',
+                className='output-content' + rtl_class
+            )
+        ]),
+        
+        html.Div(className="gallery-section", children=[
+            html.H3(texts['gallery_title'], id='gallery-title', className="gallery-title"),
+            html.Div(className='gallery-toolbar', children=[
+                html.Div(
+                    render_breadcrumbs(prefix, lang) if page_url else None,
+                    id='gallery-breadcrumbs',
+                    className='gallery-breadcrumbs'
+                ),
+                dcc.Input(
+                    id='gallery-search',
+                    type='search',
+                    debounce=True,
+                    placeholder=texts['search_placeholder'],
+                    className='gallery-search'
+                ),
+                html.Button(
+                    texts['gallery_refresh'],
+                    id='gallery-refresh-button',
+                    n_clicks=0,
+                    className='gallery-refresh-btn'
+                ),
+                # Sorting needs the metadata index
+                dcc.Dropdown(
+                    id='gallery-sort',
+                    options=sort_options(texts),
+                    value='name',
+                    clearable=False,
+                    searchable=False,
+                    className='gallery-sort',
+                    style={} if gallery_index_mode == 'sqlite' else {'display': 'none'}
+                )
+            ]),
+            dcc.Location(id='gallery-location', refresh=False, **location),
+            dcc.Store(id='gallery-view', data={'prefix': prefix, 'query': ''} if page_url else None),
+            html.Div(gallery['children'], id='s3-images', className='gallery'),
+            html.Button(
+                texts['load_more'],
+                id='gallery-more-button',
+                n_clicks=0,
+                className='process-btn',
+                style=gallery['more_style']
+            ),
+            html.Div(
+                gallery['status'],
+                id='gallery-status',
+                className='empty-state',
+                style=gallery['status_style']
+            ),
+            dcc.Store(id='gallery-cursor', data=gallery['cursor']),
+            dcc.Store(id='gallery-job', data=gallery['job']),
+            dcc.Interval(id='gallery-poll', interval=300, disabled=gallery['poll_disabled']),
+            dcc.Interval(
+                id='gallery-auto-refresh',
+                interval=max(gallery_auto_refresh_seconds, 1) * 1000,
+                disabled=gallery_auto_refresh_seconds <= 0
+            ),
+            dcc.Interval(
+                id='gallery-events-interval',
+                interval=1000,
+                disabled=not gallery_events_enabled
+            )
+        ])
     ])
-])
 
 
-# get_s3_images function (unchanged)
-def get_s3_images():
-    if not s3_client or not s3_bucket_name:
-        return []
-    
-    image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg']
-    image_urls = []
+app.layout = serve_layout
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg')
+
+
+# Bucket listings are cached per bucket; concurrent refreshes share one LIST
+s3_list_cache = TTLCache(ttl=s3_list_cache_ttl, maxsize=s3_list_cache_maxsize)
+
+
+# Single-folder listings (Prefix + Delimiter), cached per (bucket, prefix)
+s3_folder_cache = TTLCache(ttl=s3_list_cache_ttl, maxsize=s3_folder_cache_maxsize)
+
+
+# Signed URLs are reused until they get close to expiry
+presigned_url_cache = PresignedUrlCache(
+    expires_in=presign_expires_in,
+    refresh_margin=presign_refresh_margin,
+    max_bytes=presign_cache_max_bytes,
+    on_sign=record_presign
+)
+
+
+# Originals served by the /images proxy route, kept on local disk
+image_cache = ImageCache(
+    image_cache_dir,
+    max_bytes=image_cache_max_bytes,
+    ttl=image_cache_ttl,
+    max_object_bytes=image_cache_max_object_bytes
+) if gallery_image_mode == 'proxy' else None
+
+
+def cache_stats(field):
+    def collect():
+        values = {
+            ('s3_list',): s3_list_cache.stats()[field],
+            ('s3_folder',): s3_folder_cache.stats()[field],
+            ('presigned_url',): presigned_url_cache.stats()[field],
+        }
+        if image_cache is not None:
+            values[('image',)] = image_cache.stats()[field]
+        return values
+    return collect
+
+
+metrics_registry.register(CallbackGauge(
+    'cache_hit_ratio', 'Share of cache lookups served without calling S3', cache_stats('hit_ratio'), ['cache']))
+metrics_registry.register(CallbackGauge(
+    'cache_entries', 'Number of entries held in the cache', cache_stats('entries'), ['cache']))
+metrics_registry.register(CallbackCounter(
+    'cache_hits_total', 'Cache lookups served from the cache', cache_stats('hits'), ['cache']))
+metrics_registry.register(CallbackCounter(
+    'cache_misses_total', 'Cache lookups that had to call S3', cache_stats('misses'), ['cache']))
+
+
+# Downscaled variants are generated once in the background
+thumbnail_generator = ThumbnailGenerator(
+    mode=thumbnail_mode,
+    prefix=thumbnail_prefix,
+    cache_dir=thumbnail_cache_dir,
+    size=(thumbnail_width, thumbnail_height),
+    workers=thumbnail_workers,
+    retry_after=thumbnail_retry_seconds
+)
+
+
+def is_image_key(key):
+    return key.lower().endswith(IMAGE_EXTENSIONS) and not thumbnail_generator.is_thumbnail_key(key)
+
+
+# ETag of a listed object without its quotes, or None; thumbnails are named
+# after it
+def object_version(obj):
+    return (obj.get('ETag') or '').strip('"') or None
+
+
+# Image keys of the bucket and their versions
+def list_s3_image_keys(bucket):
+    keys = []
+    versions = {}
+    paginator = get_s3_client().get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket):
+        for obj in page.get('Contents', []):
+            if is_image_key(obj['Key']):
+                keys.append(obj['Key'])
+                versions[obj['Key']] = object_version(obj)
+    return keys, versions
+
+
+# One folder of the bucket: S3 groups everything below it into
+# CommonPrefixes, so the cost is the size of the folder, not the bucket
+def list_s3_folder(bucket, prefix):
+    folders = []
+    keys = []
+    versions = {}
+    paginator = get_s3_client().get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter=gallery_delimiter):
+        for common in page.get('CommonPrefixes', []):
+            if not thumbnail_generator.is_thumbnail_key(common['Prefix']):
+                folders.append(common['Prefix'])
+        for obj in page.get('Contents', []):
+            if is_image_key(obj['Key']):
+                keys.append(obj['Key'])
+                versions[obj['Key']] = object_version(obj)
+    return folders, keys, versions
+
+
+def load_cached(cache, cache_key, loader):
+    if not get_s3_client() or not s3_bucket_name:
+        return None
     
+    from botocore.exceptions import ClientError
     try:
-        response = s3_client.list_objects_v2(Bucket=s3_bucket_name)
-        
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                key = obj['Key']
-                if any(key.lower().endswith(ext) for ext in image_extensions):
-                    try:
-                        url = s3_client.generate_presigned_url(
-                            'get_object',
-                            Params={'Bucket': s3_bucket_name, 'Key': key},
-                            ExpiresIn=3600
-                        )
-                        image_urls.append({'url': url, 'key': key})
-                    except ClientError as e:
-                        print(f"Error generating presigned URL for {key}: {e}")
+        return cache.get_or_load(cache_key, loader)
     except ClientError as e:
         print(f"Error accessing S3 bucket: {e}")
-        return []
     except Exception as e:
         print(f"Unexpected error: {e}")
+    return None
+
+
+# Persistent metadata index; reads never wait for a sync
+metadata_index = None
+if gallery_index_mode == 'sqlite':
+    metadata_index = MetadataIndex(
+        gallery_index_path,
+        delimiter=gallery_delimiter,
+        include=is_image_key,
+        probe=gallery_index_probe
+    )
+
+
+# Cached index of every image key in the bucket, or None when S3 is unavailable
+def get_s3_key_index():
+    return load_cached(
+        s3_list_cache,
+        s3_bucket_name,
+        lambda: KeyIndex(*list_s3_image_keys(s3_bucket_name))
+    )
+
+
+def get_s3_image_keys():
+    index = get_s3_key_index()
+    return None if index is None else index.keys
+
+
+# Cached (folders, image keys, versions) directly under prefix, or None.
+# Without a delimiter there are no folders and the full index already has
+# the keys.
+def get_s3_folder(prefix):
+    if not gallery_delimiter:
+        index = get_s3_key_index()
+        return None if index is None else ([], index.with_prefix(prefix), index.versions)
+    return load_cached(
+        s3_folder_cache,
+        (s3_bucket_name, prefix),
+        lambda: list_s3_folder(s3_bucket_name, prefix)
+    )
+
+
+# URL the browser loads an object from: a presigned S3 URL, or the proxy
+# route, whose URL stays the same across renders so browsers can cache it
+def get_object_url(s3_client, key):
+    if image_cache is not None:
+        return app.get_relative_path('/images/' + quote(key))
+    return presigned_url_cache.get_url(s3_client, s3_bucket_name, key)
+
+
+def get_thumbnail_url(key, version):
+    s3_client = get_s3_client()
+    name = thumbnail_generator.ready_name(s3_client, s3_bucket_name, key, version)
+    if name is None:
+        return None
+    if thumbnail_generator.mode == 's3':
+        return get_object_url(s3_client, name)
+    return f"/thumbnails/{name}"
+
+
+# versions maps keys to their ETags; keys without one get no thumbnail
+def sign_s3_images(keys, versions=None):
+    from botocore.exceptions import ClientError
+    s3_client = get_s3_client()
+    versions = versions or {}
+    image_urls = []
+    missing = []
+    for key in keys:
+        try:
+            url = get_object_url(s3_client, key)
+            thumbnail_url = get_thumbnail_url(key, versions.get(key))
+            if thumbnail_url is None:
+                missing.append((key, versions.get(key)))
+            image_urls.append({'url': url, 'key': key, 'thumbnail_url': thumbnail_url})
+        except ClientError as e:
+            print(f"Error generating presigned URL for {key}: {e}")
+    # Images without a thumbnail yet are shown full size this time
+    thumbnail_generator.schedule(s3_client, s3_bucket_name, missing)
+    return image_urls
+
+
+# get_s3_images function - only the requested window of keys is signed
+def get_s3_images(offset=0, limit=None):
+    index = get_s3_key_index()
+    if not index:
         return []
     
-    return image_urls
+    end = None if limit is None else offset + limit
+    return sign_s3_images(index.keys[offset:end], index.versions)
 
 
-# Language dropdown callback - handles 10 languages, RTL only for Arabic
-@app.callback(
+# Language dropdown callback - runs in the browser from the shipped catalog
+app.clientside_callback(
+    ClientsideFunction(namespace='i18n', function_name='update_language'),
     [Output('app-title', 'children'),
      Output('input-label', 'children'),
      Output('input-text', 'placeholder'),
      Output('process-button', 'children'),
      Output('gallery-title', 'children'),
+     Output('gallery-more-button', 'children'),
+     Output('upload-label', 'children'),
+     Output('upload-prompt', 'children'),
      Output('input-section', 'className'),
      Output('output-section', 'className'),
      Output('output-text', 'className'),
-     Output('input-text', 'dir')],
-    Input('lang-dropdown', 'value')
+     Output('input-text', 'dir'),
+     Output('font-stylesheet', 'href'),
+     Output('gallery-search', 'placeholder'),
+     Output('gallery-sort', 'options'),
+     Output('gallery-refresh-button', 'children')],
+    Input('lang-dropdown', 'value'),
+    State('i18n-catalog', 'data'),
+    prevent_initial_call=True
 )
-def update_language(selected_lang):
-    # RTL only for Arabic
-    rtl_langs = ['ar']
-    is_rtl = selected_lang in rtl_langs
-    
-    texts = LANGUAGES[selected_lang]
-    dir_attr = 'rtl' if is_rtl else 'ltr'
-    
-    input_class = "input-section" + (" rtl" if is_rtl else "")
-    output_class = "output-section" + (" rtl" if is_rtl else "")
-    output_content_class = "output-content" + (" rtl" if is_rtl else "")
+
+
+def render_processed_text(n_clicks_process, input_value, selected_lang):
+    if n_clicks_process > 0 and input_value:
+        processed = text_rule_set.apply(input_value)
+        return processed
+    return localized_text('output_placeholder', selected_lang)
+
+
+# Text processing callback - how it is triggered depends on the deployment.
+# The language is only State: a switch relabels the placeholder in the
+# browser (i18n.relabel) and never reprocesses the text.
+if process_trigger_mode == 'clientside':
+    app.clientside_callback(
+        ClientsideFunction(namespace='text', function_name='process'),
+        Output('output-text', 'children'),
+        [Input('process-button', 'n_clicks'),
+         Input('input-text', 'value')],
+        [State('lang-dropdown', 'value'),
+         State('text-rules', 'data'),
+         State('i18n-catalog', 'data')],
+        prevent_initial_call=True
+    )
+elif process_trigger_mode == 'debounce':
+    # Keystrokes only restart a browser-side timer; the server is called
+    # once typing pauses for process_debounce_ms
+    app.clientside_callback(
+        ClientsideFunction(namespace='text', function_name='debounce'),
+        [Output('process-debounce', 'interval'),
+         Output('process-debounce', 'max_intervals')],
+        Input('input-text', 'value'),
+        [State('process-button', 'n_clicks'),
+         State('process-debounce', 'n_intervals'),
+         State('process-debounce', 'interval')],
+        prevent_initial_call=True
+    )
     
-    return (
-        texts['title'],
-        texts['input_label'],
-        texts['input_placeholder'],
-        texts['process_button'],
-        texts['gallery_title'],
-        input_class,
-        output_class,
-        output_content_class,
-        dir_attr
+    @app.callback(
+        Output('output-text', 'children'),
+        [Input('process-button', 'n_clicks'),
+         Input('process-debounce', 'n_intervals')],
+        [State('input-text', 'value'),
+         State('lang-dropdown', 'value')],
+        prevent_initial_call=True
     )
+    def process_text(n_clicks_process, n_intervals, input_value, selected_lang):
+        return render_processed_text(n_clicks_process, input_value, selected_lang)
+else:
+    @app.callback(
+        Output('output-text', 'children'),
+        Input('process-button', 'n_clicks'),
+        [State('input-text', 'value'),
+         State('lang-dropdown', 'value')],
+        prevent_initial_call=True
+    )
+    def process_text(n_clicks_process, input_value, selected_lang):
+        return render_processed_text(n_clicks_process, input_value, selected_lang)
+
+
+# Large uploads are decoded, transformed and written to disk chunk by chunk
+# on a background worker; the browser polls for progress and downloads the
+# result from /downloads/<job id> instead of receiving it inline.
+def iter_upload_text(contents, job):
+    data = contents.partition(',')[2]
+    # Base64 decodes in whole 4-character groups
+    step = max(4, text_stream_chunk_size // 3 * 4)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for start in range(0, len(data), step):
+        yield decoder.decode(base64.b64decode(data[start:start + step]))
+        job.progress = min(start + step, len(data)) / len(data)
+    yield decoder.decode(b'', final=True)
+
+
+@job_duration.time(job='process_upload')
+def process_upload(job, contents, filename):
+    os.makedirs(text_stream_dir, exist_ok=True)
+    path = os.path.join(text_stream_dir, f"{job.id}.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in text_rule_set.stream(iter_upload_text(contents, job)):
+            f.write(chunk)
+    return {'path': path, 'filename': f"processed-{filename or 'text.txt'}"}
+
+
+def remove_upload_result(job):
+    if job.result and os.path.exists(job.result['path']):
+        os.remove(job.result['path'])
+
+
+make_private_dir(job_store_dir)
+
+
+upload_jobs = JobManager(
+    max_workers=text_stream_workers,
+    retention=text_stream_retention,
+    on_expire=remove_upload_result,
+    name='upload',
+    store=JobStore(os.path.join(job_store_dir, 'upload'))
+)
 
 
-# Text processing callback
 @app.callback(
-    Output('output-text', 'children'),
-    [Input('process-button', 'n_clicks'),
-     Input('input-text', 'value')],
-    [Input('lang-dropdown', 'value')]
+    [Output('upload-job', 'data'),
+     Output('upload-interval', 'disabled')],
+    Input('upload-text', 'contents'),
+    State('upload-text', 'filename'),
+    prevent_initial_call=True
 )
-def process_text(n_clicks_process, input_value, selected_lang):
-    if n_clicks_process > 0 and input_value:
-        processed = input_value.replace('a', '@').replace('i', '!').replace('e', '&')
-        return processed
-    texts = LANGUAGES[selected_lang]
-    return texts['output_placeholder']
+def start_upload_processing(contents, filename):
+    if not contents:
+        return None, True
+    job = upload_jobs.submit(process_upload, contents, filename)
+    return job.id, False
 
 
-# S3 images callback
 @app.callback(
-    Output('s3-images', 'children'),
-    Input('process-button', 'n_clicks'),
-    [Input('lang-dropdown', 'value')]
+    [Output('upload-status', 'children'),
+     Output('upload-interval', 'disabled', allow_duplicate=True)],
+    Input('upload-interval', 'n_intervals'),
+    [State('upload-job', 'data'),
+     State('lang-dropdown', 'value')],
+    prevent_initial_call=True
 )
-def display_s3_images(n_clicks_process, selected_lang):
-    images = get_s3_images()
+def poll_upload_processing(n_intervals, job_id, selected_lang):
+    texts = LANGUAGES[selected_lang]
+    job = upload_jobs.get(job_id) if job_id else None
+    if job is None or job.status == 'failed':
+        return texts['upload_failed'], True
+    if job.status != 'done':
+        percent = int(job.progress * 100)
+        return texts['upload_progress'].format(percent=percent), False
+    return html.A(
+        texts['upload_download'],
+        href=f"/downloads/{job.id}",
+        download=job.result['filename']
+    ), True
+
+
+@app.server.route('/downloads/<job_id>')
+def download_upload_result(job_id):
+    job = upload_jobs.get(job_id)
+    if job is None or job.status != 'done':
+        abort(404)
+    return send_file(
+        job.result['path'],
+        mimetype='text/plain',
+        as_attachment=True,
+        download_name=job.result['filename']
+    )
+
+
+# Batch text processing API. Accepts a JSON list of documents or NDJSON (one
+# document per line) and streams NDJSON results back in input order.
+batch_processor = BatchProcessor(
+    rule_set=text_rule_set,
+    workers=batch_workers,
+    chunk_size=batch_chunk_size,
+    max_inflight=batch_max_inflight
+)
+# Pool processes are not forked from this one and would outlive it
+atexit.register(batch_processor.shutdown)
+
+
+def iter_limited_lines(stream, max_bytes):
+    total = 0
+    for line in stream:
+        total += len(line)
+        if total > max_bytes:
+            raise BatchRequestError(f"Request body too large (limit {max_bytes} bytes)", status=413)
+        yield line
+
+
+# Content-Length is absent on chunked uploads, so the limit is enforced on
+# what is actually read
+def read_limited(stream, max_bytes):
+    body = stream.read(max_bytes + 1)
+    if len(body) > max_bytes:
+        raise BatchRequestError(f"Request body too large (limit {max_bytes} bytes)", status=413)
+    return body
+
+
+# Problems found before the first result (an oversized JSON body, a bad first
+# document) get an error status. NDJSON is read while results stream out, so
+# a limit or parse error further in arrives as a final {"error", "status"}
+# line of the 200 response, and no results follow it.
+@app.server.route('/api/v1/process', methods=['POST'])
+def batch_process():
+    if request.content_length is not None and request.content_length > batch_max_bytes:
+        return jsonify(error=f"Request body too large (limit {batch_max_bytes} bytes)"), 413
     
-    if not images:
-        if not s3_client or not s3_bucket_name:
-            texts = LANGUAGES[selected_lang]
-            return html.Div(
-                texts['no_s3_config'],
-                className='empty-state'
+    try:
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            documents = iter_ndjson_documents(
+                iter_limited_lines(request.stream, batch_max_bytes),
+                batch_max_documents
             )
-        texts = LANGUAGES[selected_lang]
-        return html.Div(texts['no_images'], className='empty-state')
+        else:
+            documents = parse_json_documents(read_limited(request.stream, batch_max_bytes), batch_max_documents)
+        results = batch_processor.process(documents)
+        first = next(results, None)
+    except BatchRequestError as e:
+        return jsonify(error=str(e)), e.status
+    
+    def generate():
+        if first is None:
+            return
+        try:
+            doc_id, text = first
+            yield json.dumps({'id': doc_id, 'text': text}, ensure_ascii=False) + '\n'
+            for doc_id, text in results:
+                yield json.dumps({'id': doc_id, 'text': text}, ensure_ascii=False) + '\n'
+        except BatchRequestError as e:
+            # Headers are already sent; report the problem in-band
+            yield json.dumps({'error': str(e), 'status': e.status}) + '\n'
     
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def render_gallery_items(images):
     image_elements = []
     for img in images:
         image_elements.append(
-            html.Div(className='gallery-item', children=[
-                html.Img(
-                    src=img['url'],
-                    className='gallery-img',
-                    alt=img['key']
+            html.Div(className='gallery-item', key=img['key'], children=[
+                html.A(
+                    html.Img(
+                        src=img.get('thumbnail_url') or img['url'],
+                        className='gallery-img',
+                        width=img.get('width'),
+                        height=img.get('height'),
+                        alt=img['key']
+                    ),
+                    href=img['url'],
+                    target='_blank',
+                    className='gallery-link'
                 ),
                 html.P(img['key'], className='gallery-filename')
             ])
         )
+    return image_elements
+
+
+# The current folder lives in the page URL (?prefix=...), so the back button
+# and shared links work
+def gallery_prefix(search):
+    return parse_qs((search or '').lstrip('?')).get('prefix', [''])[0]
+
+
+def folder_href(prefix):
+    query = '?' + urlencode({'prefix': prefix}) if prefix else ''
+    return app.get_relative_path('/') + query
+
+
+# Every folder containing key, from the bucket root down
+def folder_prefixes(key):
+    prefixes = ['']
+    if gallery_delimiter:
+        cut = key.find(gallery_delimiter)
+        while cut != -1:
+            prefixes.append(key[:cut + len(gallery_delimiter)])
+            cut = key.find(gallery_delimiter, cut + len(gallery_delimiter))
+    return prefixes
+
+
+def render_breadcrumbs(prefix, selected_lang):
+    crumbs = [dcc.Link(
+        localized_text('gallery_root', selected_lang),
+        href=folder_href(''),
+        className='gallery-crumb'
+    )]
+    if not gallery_delimiter:
+        return crumbs
+    parts = prefix.split(gallery_delimiter)[:-1]
+    for i, part in enumerate(parts):
+        crumbs.append(html.Span(gallery_delimiter, className='gallery-crumb-separator'))
+        crumbs.append(dcc.Link(
+            part,
+            href=folder_href(gallery_delimiter.join(parts[:i + 1]) + gallery_delimiter),
+            className='gallery-crumb'
+        ))
+    return crumbs
+
+
+def render_gallery_folders(folders, prefix):
+    return [
+        html.Div(className='gallery-item gallery-folder', key=folder, children=[
+            dcc.Link(folder[len(prefix):], href=folder_href(folder), className='gallery-link')
+        ])
+        for folder in folders
+    ]
+
+
+# One page of a folder or of the search results within it, as (folders,
+# [{'key', 'etag', 'width', 'height'}], total), or None when S3 is unavailable.
+# Served from the metadata index once it has synced, from cached listings
+# otherwise.
+def find_gallery_page(prefix, query, sort, offset, limit):
+    if metadata_index is not None and s3_bucket_name:
+        metadata_index.start(get_s3_client, s3_bucket_name, gallery_index_sync_interval)
+        if metadata_index.synced_at(s3_bucket_name) is not None:
+            folders = metadata_index.folders(s3_bucket_name, prefix) if not query else []
+            images = metadata_index.page(
+                s3_bucket_name, prefix, query, sort, offset, limit
+            )
+            total = metadata_index.count(s3_bucket_name, prefix, query)
+            if query:
+                total = min(total, gallery_search_limit)
+            return folders, images, total
     
-    return html.Div(image_elements, className='gallery')
+    if query:
+        index = get_s3_key_index()
+        listing = None if index is None else ([], index.search(query, prefix, gallery_search_limit), index.versions)
+    else:
+        listing = get_s3_folder(prefix)
+    if listing is None:
+        return None
+    folders, keys, versions = listing
+    window = [{'key': key, 'etag': versions.get(key)} for key in keys[offset:offset + limit]]
+    return folders, window, len(keys)
+
+
+# A refresh re-lists the folder into the metadata index instead of waiting
+# for the next background sync, unless a sync of the bucket is running
+def refresh_metadata_index(prefix):
+    if metadata_index is None or not s3_bucket_name or metadata_index.synced_at(s3_bucket_name) is None:
+        return
+    s3_client = get_s3_client()
+    if s3_client is None:
+        return
+    try:
+        metadata_index.refresh(s3_client, s3_bucket_name, prefix)
+    except Exception as e:
+        print(f"ERROR: Metadata index refresh of '{prefix}' failed: {e}")
+
+
+# Builds one page of the gallery. Runs on the gallery job pool, so a slow or
+# throttled S3 never holds up a request worker. A refresh drops the cached
+# listing first so new uploads show up.
+@job_duration.time(job='build_gallery_page')
+@profiler.profiled('build_gallery_page')
+def build_gallery_page(job, offset, limit, selected_lang, prefix, query, sort, refresh=False):
+    hidden = {'display': 'none'}
+    if refresh:
+        s3_folder_cache.invalidate((s3_bucket_name, prefix))
+        if query or not gallery_delimiter:
+            s3_list_cache.invalidate(s3_bucket_name)
+        refresh_metadata_index(prefix)
+    folders, window, total = find_gallery_page(prefix, query, sort, offset, limit) or ([], [], 0)
+    # Here rather than on a request thread (see initial_gallery)
+    if s3_bucket_name and get_s3_client():
+        thumbnail_generator.load_existing(get_s3_client(), s3_bucket_name)
+    
+    if not folders and not window:
+        if not get_s3_client() or not s3_bucket_name:
+            return localized_text('no_s3_config', selected_lang, html.Div, className='empty-state'), 0, hidden
+        key = 'no_results' if query else 'no_images'
+        return localized_text(key, selected_lang, html.Div, className='empty-state'), 0, hidden
+    
+    if job.cancelled:
+        return None
+    
+    images = sign_s3_images(
+        [image['key'] for image in window],
+        {image['key']: image['etag'] for image in window}
+    )
+    dimensions = {image['key']: image for image in window}
+    for image in images:
+        image['width'] = dimensions[image['key']].get('width')
+        image['height'] = dimensions[image['key']].get('height')
+    image_elements = render_gallery_items(images)
+    if offset == 0:
+        image_elements = render_gallery_folders(folders, prefix) + image_elements
+    next_cursor = offset + len(window)
+    more_style = {} if next_cursor < total else hidden
+    return image_elements, next_cursor, more_style
+
+
+# Rendered pages are Dash components; other workers read them back as the
+# same JSON the browser receives
+def components_to_json(value):
+    from plotly.utils import PlotlyJSONEncoder
+    return json.dumps(value, cls=PlotlyJSONEncoder)
+
+
+gallery_jobs = JobManager(
+    max_workers=gallery_job_workers,
+    retention=gallery_job_retention,
+    name='gallery',
+    max_pending=gallery_job_max_pending,
+    store=JobStore(os.path.join(job_store_dir, 'gallery'), dumps=components_to_json)
+)
+
+
+# S3 images callback - starts a background job for one page of the gallery
+# and shows a placeholder; a newer trigger cancels the previous job. Only
+# gallery controls trigger it: processing text or switching language never
+# touches S3 (the language is read as State for the empty-state texts).
+@app.callback(
+    [Output('gallery-job', 'data'),
+     Output('gallery-poll', 'disabled'),
+     Output('gallery-status', 'children'),
+     Output('gallery-status', 'style'),
+     Output('gallery-breadcrumbs', 'children'),
+     Output('gallery-view', 'data')],
+    [Input('gallery-refresh-button', 'n_clicks'),
+     Input('gallery-auto-refresh', 'n_intervals'),
+     Input('gallery-more-button', 'n_clicks'),
+     Input('gallery-location', 'search'),
+     Input('gallery-search', 'value'),
+     Input('gallery-sort', 'value')],
+    [State('lang-dropdown', 'value'),
+     State('gallery-cursor', 'data'),
+     State('gallery-job', 'data')],
+    prevent_initial_call=True
+)
+def display_s3_images(n_clicks_refresh, n_intervals, n_clicks_more, location_search, query, sort,
+                      selected_lang, cursor, previous_job):
+    load_more = ctx.triggered_id == 'gallery-more-button'
+    # Only the Refresh button re-lists the bucket; auto-refresh ticks from
+    # every open page read the shared listing cache, which expires on its own
+    refresh = ctx.triggered_id == 'gallery-refresh-button'
+    reload = refresh or ctx.triggered_id == 'gallery-auto-refresh'
+    offset = (cursor or 0) if load_more else 0
+    # A reload covers everything already shown, not just the first page
+    limit = max(cursor or 0, gallery_page_size) if reload else gallery_page_size
+    prefix = gallery_prefix(location_search)
+    query = (query or '').strip()
+    breadcrumbs = render_breadcrumbs(prefix, selected_lang)
+    view = {'prefix': prefix, 'query': query}
+    
+    # A job shared by several page loads keeps running for the others
+    if previous_job and not previous_job.get('shared'):
+        gallery_jobs.cancel(previous_job['id'])
+    
+    try:
+        job = gallery_jobs.submit(
+            build_gallery_page, offset, limit, selected_lang, prefix, query, sort, refresh
+        )
+    except JobQueueFull:
+        return None, True, localized_text('gallery_busy', selected_lang), {}, breadcrumbs, view
+    
+    # Auto-refresh runs quietly, without the loading placeholder
+    if ctx.triggered_id == 'gallery-auto-refresh':
+        status, status_style = dash.no_update, dash.no_update
+    else:
+        status, status_style = localized_text('gallery_loading', selected_lang), {}
+    return {'id': job.id, 'load_more': load_more}, False, status, status_style, breadcrumbs, view
+
+
+# Language switch - relabels the catalog texts rendered by callbacks (the
+# gallery, the output placeholder) in the browser
+app.clientside_callback(
+    ClientsideFunction(namespace='i18n', function_name='relabel'),
+    [Output('s3-images', 'children', allow_duplicate=True),
+     Output('gallery-breadcrumbs', 'children', allow_duplicate=True),
+     Output('gallery-status', 'children', allow_duplicate=True),
+     Output('output-text', 'children', allow_duplicate=True)],
+    Input('lang-dropdown', 'value'),
+    [State('s3-images', 'children'),
+     State('gallery-breadcrumbs', 'children'),
+     State('gallery-status', 'children'),
+     State('output-text', 'children'),
+     State('i18n-catalog', 'data')],
+    prevent_initial_call=True
+)
+
+
+# Delivers the finished page; "load more" appends it to the gallery with a
+# Patch instead of re-sending the whole tree. A job that failed, or that no
+# worker knows any more (expired, or its process exited), leaves a message.
+@app.callback(
+    [Output('s3-images', 'children'),
+     Output('gallery-cursor', 'data'),
+     Output('gallery-more-button', 'style'),
+     Output('gallery-status', 'children', allow_duplicate=True),
+     Output('gallery-status', 'style', allow_duplicate=True),
+     Output('gallery-poll', 'disabled', allow_duplicate=True)],
+    Input('gallery-poll', 'n_intervals'),
+    [State('gallery-job', 'data'),
+     State('lang-dropdown', 'value')],
+    prevent_initial_call=True
+)
+def poll_s3_images(n_intervals, current_job, selected_lang):
+    hidden = {'display': 'none'}
+    if not current_job:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, hidden, True
+    job = gallery_jobs.get(current_job['id'])
+    
+    if job is not None and not job.done:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, False
+    if job is None or job.status == 'failed':
+        return dash.no_update, dash.no_update, dash.no_update, localized_text('gallery_failed', selected_lang), {}, True
+    if job.status != 'done' or job.result is None:
+        # Cancelled in favour of a newer job, which the next poll picks up
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, hidden, True
+    
+    image_elements, next_cursor, more_style = job.result
+    if current_job['load_more']:
+        patched = Patch()
+        patched.extend(image_elements)
+        image_elements = patched
+    return image_elements, next_cursor, more_style, dash.no_update, hidden, True
+
+
+# Keeps the cached listing in step with the change feed and renders the
+# delta pushed to connected clients
+def apply_bucket_changes(changes):
+    added = {}
+    removed = {}
+    for event_type, bucket, key, etag in changes:
+        if bucket != s3_bucket_name or thumbnail_generator.is_thumbnail_key(key):
+            continue
+        if not key.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        if event_type == 'added':
+            removed.pop(key, None)
+            added[key] = etag
+        else:
+            added.pop(key, None)
+            removed[key] = True
+    
+    if not added and not removed:
+        return None
+    
+    index = s3_list_cache.get(s3_bucket_name)
+    if index is not None:
+        existing = set(index.keys)
+        keys = [key for key in index.keys if key not in removed]
+        keys.extend(key for key in added if key not in existing)
+        versions = {key: version for key, version in index.versions.items() if key not in removed}
+        versions.update(added)
+        s3_list_cache.set(s3_bucket_name, KeyIndex(sorted(keys), versions))
+    for key in list(added) + list(removed):
+        for prefix in folder_prefixes(key):
+            s3_folder_cache.invalidate((s3_bucket_name, prefix))
+    if metadata_index is not None:
+        for key, etag in added.items():
+            metadata_index.upsert(s3_bucket_name, key, etag)
+        for key in removed:
+            metadata_index.delete(s3_bucket_name, key)
+    # An upload may replace an object under the same key
+    if image_cache is not None:
+        for key in list(added) + list(removed):
+            image_cache.invalidate(s3_bucket_name, key)
+    
+    # Keys that fail to sign are left out, so folders follow the rendered images
+    images = sign_s3_images(list(added), added)
+    return {
+        'added': render_gallery_items(images),
+        'folders': [folder_prefixes(image['key'])[-1] for image in images],
+        'removed': list(removed)
+    }
+
+
+gallery_event_broker = None
+if gallery_events_enabled:
+    if gallery_events_mode == 'sqs':
+        # Long polls wait up to 20 seconds, so reads may take longer than S3's
+        sqs_client_factory = ClientFactory('sqs', partial(
+            s3_client_config,
+            region=aws_region,
+            max_pool_connections=2,
+            connect_timeout=s3_connect_timeout,
+            read_timeout=30,
+            retry_mode=s3_retry_mode,
+            max_attempts=s3_max_attempts,
+            tcp_keepalive=s3_tcp_keepalive
+        ))
+        gallery_events_feed = SqsChangeFeed(sqs_client_factory.get, gallery_events_queue_url)
+    else:
+        gallery_events_feed = LocalChangeFeed(gallery_events_dir)
+    gallery_event_broker = GalleryEventBroker(
+        gallery_events_feed,
+        ChangeLog(gallery_events_log_path),
+        apply_bucket_changes,
+        max_subscribers=gallery_events_max_subscribers,
+        max_stream_seconds=gallery_events_max_stream_seconds
+    )
+
+
+# Every worker follows the change feed from its first request on, so its
+# cached listings stay current whether or not it serves an event stream
+@app.server.before_request
+def start_gallery_events():
+    if gallery_event_broker is not None:
+        gallery_event_broker.start()
+
+
+# Server-sent event stream of gallery deltas
+@app.server.route('/events/gallery')
+def gallery_events():
+    if gallery_event_broker is None:
+        abort(404)
+    from plotly.utils import PlotlyJSONEncoder
+    try:
+        subscriber = gallery_event_broker.subscribe()
+    except TooManySubscribers:
+        # The browser tries again later (gallery_events.js)
+        return Response(status=503, headers={'Retry-After': '30'})
+    return Response(
+        gallery_event_broker.stream(subscriber, encoder=PlotlyJSONEncoder),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# Deltas are applied in the browser; the interval only drains the local buffer
+app.clientside_callback(
+    ClientsideFunction(namespace='gallery', function_name='apply_events'),
+    Output('s3-images', 'children', allow_duplicate=True),
+    Input('gallery-events-interval', 'n_intervals'),
+    [State('s3-images', 'children'),
+     State('gallery-view', 'data')],
+    prevent_initial_call=True
+)
+
+
+# Liveness: the process is up and serving requests
+@app.server.route('/healthz')
+def healthz():
+    return jsonify(status='ok')
+
+
+# Readiness: S3 is reachable (or deliberately not configured)
+@app.server.route('/readyz')
+def readyz():
+    s3_status = s3_readiness.status()
+    ready = s3_status['status'] in ('ok', 'not_configured')
+    return jsonify(status='ready' if ready else 'not_ready', s3=s3_status), 200 if ready else 503
+
+
+# Metrics are kept per process: behind a multi-worker server each scrape
+# sees the worker that answered it (see metrics.py)
+@app.server.route('/metrics')
+def metrics():
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def is_callback_request():
+    return request.path.endswith('/_dash-update-component')
+
+
+# Name of the callback function a Dash update request runs. It becomes a
+# metric label, so outputs that are not registered (the request body is
+# client-supplied) all count as 'unknown'.
+def callback_name():
+    body = request.get_json(silent=True) or {}
+    output = body.get('output')
+    func = app.callback_map.get(output, {}).get('callback') if isinstance(output, str) else None
+    return getattr(func, '__name__', 'unknown')
+
+
+# Callback latency and payload sizes, measured around the Dash update route
+@app.server.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.server.after_request
+def record_callback_metrics(response):
+    if not is_callback_request():
+        return response
+    
+    callback = callback_name()
+    callback_duration.observe(time.perf_counter() - g.request_started, callback=callback)
+    callback_request_bytes.observe(request.content_length or 0, callback=callback)
+    response_length = response.calculate_content_length()
+    if response_length is not None:
+        callback_response_bytes.observe(response_length, callback=callback)
+    return response
+
+
+# Callback profiling (see profiling.Profiler); with profiling off this is a
+# header lookup per callback request
+@app.server.before_request
+def start_callback_profile():
+    if not is_callback_request():
+        return
+    mode = profiler.requested_mode(request.headers)
+    g.profile_requested = mode is not None
+    g.profile_run = profiler.begin(callback_name(), mode)
+
+
+@app.server.after_request
+def finish_callback_profile(response):
+    name = profiler.end(g.pop('profile_run', None))
+    # Only token holders learn where their profile went
+    if name and g.get('profile_requested'):
+        response.headers['X-Profile-File'] = name
+    return response
+
+
+# after_request does not run when a request fails outright
+@app.server.teardown_request
+def discard_callback_profile(exc):
+    profiler.end(g.pop('profile_run', None))
+
+
+# Profile files, for holders of PROFILE_TOKEN
+def check_profile_token():
+    if not profile_token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('X-Profile-Token', ''), profile_token):
+        abort(403)
+
+
+@app.server.route('/debug/profiles')
+def list_profiles():
+    check_profile_token()
+    return jsonify(profiles=profiler.files())
+
+
+@app.server.route('/debug/profiles/<name>')
+def download_profile(name):
+    check_profile_token()
+    return send_from_directory(profile_dir, name, as_attachment=True)
+
+
+# The first request of a new worker starts the S3 check without waiting on it
+@app.server.before_request
+def warm_s3_readiness():
+    s3_readiness.status()
+
+
+@app.server.route('/static/<path:name>')
+def serve_static(name):
+    response = static_files.response(name, request)
+    if response is None:
+        abort(404)
+    return response
+
+
+# The layout is rendered in the visitor's language (see serve_layout)
+@app.server.after_request
+def vary_layout_language(response):
+    if request.path.endswith('/_dash-layout'):
+        response.vary.update(('Cookie', 'Accept-Language'))
+    return response
+
+
+@app.server.after_request
+def compress(response):
+    if compress_responses:
+        return compress_response(response, request)
+    return response
+
+
+# Image proxy: serves originals from the local disk cache with a stable URL,
+# ETag and Range support. Objects too large to cache are streamed from S3,
+# passing Range and If-None-Match through.
+@app.server.route('/images/<path:key>')
+def serve_image(key):
+    if image_cache is None or not key.lower().endswith(IMAGE_EXTENSIONS):
+        abort(404)
+    s3_client = get_s3_client()
+    if s3_client is None or not s3_bucket_name:
+        abort(503)
+    from botocore.exceptions import ClientError
+    try:
+        cached = image_cache.get(s3_client, s3_bucket_name, key)
+    except ClientError as e:
+        if is_not_found(e):
+            abort(404)
+        print(f"ERROR: Image proxy failed for {key}: {e}")
+        abort(502)
+    if cached is None:
+        return isolate_bucket_content(stream_s3_object(s3_client, key), key)
+    
+    path, meta = cached
+    response = send_file(
+        path,
+        mimetype=meta['content_type'] or 'application/octet-stream',
+        etag=(meta['etag'] or '').strip('"') or True,
+        last_modified=meta['last_modified'],
+        max_age=image_proxy_max_age,
+        conditional=True
+    )
+    response.cache_control.public = True
+    return isolate_bucket_content(response, key)
+
+
+# Bucket objects are served from the app's origin, so a script inside one
+# (an SVG, or anything a browser sniffs as HTML) must not run with the app's
+# cookies. The sandbox gives the document an opaque origin; <img> tags are
+# unaffected, and SVGs opened directly are downloaded instead of rendered.
+def isolate_bucket_content(response, key):
+    response.headers['Content-Security-Policy'] = 'sandbox'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    if key.lower().endswith('.svg') or response.mimetype == 'image/svg+xml':
+        response.headers['Content-Disposition'] = 'attachment'
+    return response
+
+
+def stream_s3_object(s3_client, key):
+    from botocore.exceptions import ClientError
+    params = {'Bucket': s3_bucket_name, 'Key': key}
+    if request.range:
+        params['Range'] = request.headers['Range']
+    if request.if_none_match:
+        params['IfNoneMatch'] = request.headers['If-None-Match']
+    try:
+        obj = s3_client.get_object(**params)
+    except ClientError as e:
+        status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        if status in (304, 416):
+            return Response(status=status)
+        if is_not_found(e):
+            abort(404)
+        print(f"ERROR: Image proxy failed for {key}: {e}")
+        abort(502)
+    
+    response = Response(
+        obj['Body'].iter_chunks(1024 * 1024),
+        status=206 if obj.get('ContentRange') else 200,
+        mimetype=obj.get('ContentType') or 'application/octet-stream',
+        direct_passthrough=True
+    )
+    response.content_length = obj['ContentLength']
+    if obj.get('ContentRange'):
+        response.headers['Content-Range'] = obj['ContentRange']
+    response.accept_ranges = 'bytes'
+    if obj.get('ETag'):
+        response.set_etag(obj['ETag'].strip('"'))
+    response.last_modified = obj.get('LastModified')
+    response.cache_control.public = True
+    response.cache_control.max_age = image_proxy_max_age
+    return response
+
+
+# Locally cached thumbnails are immutable, so browsers may keep them forever
+@app.server.route('/thumbnails/<path:name>')
+def serve_thumbnail(name):
+    if thumbnail_generator.mode != 'local':
+        abort(404)
+    return send_from_directory(thumbnail_cache_dir, name, max_age=31536000)
 
 
 if __name__ == '__main__':
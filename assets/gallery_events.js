@@ -0,0 +1,63 @@
+// Applies bucket change deltas pushed over server-sent events to the
+// gallery, without re-requesting the listing from the server.
+(function () {
+    var pending = [];
+    var source = null;
+    var retryAt = 0;
+
+    // The browser reconnects by itself when a stream ends, but gives up on
+    // an error response (503 when the server has too many streams open), so
+    // that case is retried here after a pause
+    function connect() {
+        if (source || !window.EventSource || Date.now() < retryAt) {
+            return;
+        }
+        source = new EventSource('/events/gallery');
+        source.onmessage = function (event) {
+            pending.push(JSON.parse(event.data));
+        };
+        source.onerror = function () {
+            if (source.readyState === EventSource.CLOSED) {
+                source = null;
+                retryAt = Date.now() + 30000;
+            }
+        };
+    }
+
+    function itemKey(item) {
+        return item && item.props ? item.props.key : undefined;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        gallery: {
+            apply_events: function (n_intervals, children, view) {
+                connect();
+                if (!pending.length) {
+                    return window.dash_clientside.no_update;
+                }
+
+                var items = Array.isArray(children) ? children.slice() : [];
+                pending.splice(0).forEach(function (delta) {
+                    var removed = delta.removed || [];
+                    items = items.filter(function (item) {
+                        return removed.indexOf(itemKey(item)) === -1;
+                    });
+                    (delta.added || []).forEach(function (item, i) {
+                        // New images only belong in the folder being browsed
+                        if (!view || view.query || (delta.folders || [])[i] !== view.prefix) {
+                            return;
+                        }
+                        var key = itemKey(item);
+                        var exists = items.some(function (other) {
+                            return itemKey(other) === key;
+                        });
+                        if (!exists) {
+                            items.push(item);
+                        }
+                    });
+                });
+                return items;
+            }
+        }
+    });
+})();
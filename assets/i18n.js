@@ -0,0 +1,71 @@
+// Relabels the page from the localization catalog shipped with the layout,
+// so switching languages never calls the server.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    i18n: {
+        update_language: function (lang, catalog) {
+            var texts = catalog.texts[lang];
+            var isRtl = catalog.rtl.indexOf(lang) !== -1;
+            var rtlClass = isRtl ? ' rtl' : '';
+
+            // The server renders the next page load in this language
+            document.cookie = 'lang=' + encodeURIComponent(lang) + '; path=/; max-age=31536000; samesite=lax';
+
+            return [
+                texts.title,
+                texts.input_label,
+                texts.input_placeholder,
+                texts.process_button,
+                texts.gallery_title,
+                texts.load_more,
+                texts.upload_label,
+                texts.upload_prompt,
+                'input-section' + rtlClass,
+                'output-section' + rtlClass,
+                'output-content' + rtlClass,
+                isRtl ? 'rtl' : 'ltr',
+                catalog.fonts[lang],
+                texts.search_placeholder,
+                [
+                    {label: texts.sort_name, value: 'name'},
+                    {label: texts.sort_newest, value: 'newest'},
+                    {label: texts.sort_largest, value: 'largest'}
+                ],
+                texts.gallery_refresh
+            ];
+        },
+
+        // Replaces the text of every component tagged with data-i18n in the
+        // given trees; untouched trees are not sent back to the renderer.
+        relabel: function (lang, images, breadcrumbs, status, output, catalog) {
+            var texts = catalog.texts[lang];
+
+            function walk(node) {
+                if (Array.isArray(node)) {
+                    var changed = false;
+                    var items = node.map(function (child) {
+                        var result = walk(child);
+                        changed = changed || result !== child;
+                        return result;
+                    });
+                    return changed ? items : node;
+                }
+                if (!node || !node.props) {
+                    return node;
+                }
+                var key = node.props['data-i18n'];
+                var children = key && texts[key] !== undefined ? texts[key] : walk(node.props.children);
+                if (children === node.props.children) {
+                    return node;
+                }
+                return Object.assign({}, node, {
+                    props: Object.assign({}, node.props, {children: children})
+                });
+            }
+
+            return [images, breadcrumbs, status, output].map(function (tree) {
+                var result = walk(tree);
+                return result === tree ? window.dash_clientside.no_update : result;
+            });
+        }
+    }
+});
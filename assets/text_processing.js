@@ -0,0 +1,55 @@
+// Clientside helpers for the text processing trigger modes.
+(function () {
+    var compiled = null;
+
+    function escapeRegExp(text) {
+        return text.replace(/[.*+?^${}()|[\]\\\/-]/g, '\\$&');
+    }
+
+    // Longest patterns first, so the alternation prefers the longest rule
+    // at each position like the server-side RuleSet does
+    function compile(rules) {
+        var patterns = Object.keys(rules).sort(function (a, b) {
+            return b.length - a.length;
+        });
+        if (!patterns.length) {
+            return null;
+        }
+        return new RegExp(patterns.map(escapeRegExp).join('|'), 'g');
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        text: {
+            // Restarts the debounce timer on every keystroke. Changing the
+            // interval period is what makes dcc.Interval restart its timer.
+            debounce: function (value, n_clicks, n_intervals, interval) {
+                if (!n_clicks) {
+                    return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+                }
+                var next = interval % 2 ? interval - 1 : interval + 1;
+                return [next, (n_intervals || 0) + 1];
+            },
+
+            process: function (n_clicks, value, lang, rules, catalog) {
+                if (n_clicks > 0 && value) {
+                    if (!compiled || compiled.rules !== rules) {
+                        compiled = {rules: rules, regex: compile(rules)};
+                    }
+                    if (!compiled.regex) {
+                        return value;
+                    }
+                    return value.replace(compiled.regex, function (match) {
+                        return rules[match];
+                    });
+                }
+                // Tagged like the server's localized_text, so i18n.relabel
+                // can switch its language
+                return {
+                    namespace: 'dash_html_components',
+                    type: 'Span',
+                    props: {children: catalog.texts[lang].output_placeholder, 'data-i18n': 'output_placeholder'}
+                };
+            }
+        }
+    });
+})();
@@ -0,0 +1,63 @@
+import os
+import threading
+
+
+def s3_client_config(region, max_pool_connections, connect_timeout, read_timeout,
+                     retry_mode, max_attempts, tcp_keepalive):
+    from botocore.config import Config
+    return Config(
+        region_name=region,
+        max_pool_connections=max_pool_connections,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        retries={'mode': retry_mode, 'total_max_attempts': max_attempts},
+        tcp_keepalive=tcp_keepalive
+    )
+
+
+# Lazily creates one client per process and shares it between threads.
+# botocore clients are thread-safe once built, but building one through the
+# default session is not, so creation is locked and uses its own session.
+# After a fork (e.g. gunicorn workers) the child drops the inherited client
+# and its connection pool and builds a fresh one on first use. on_create is
+# called with every new client, e.g. to register botocore event hooks.
+#
+# boto3 takes longer to import than the rest of the app, so it is imported
+# with the first client rather than at startup; config may be a function
+# returning the botocore Config for the same reason.
+class ClientFactory:
+    def __init__(self, service, config, on_create=None, endpoint_url=None):
+        self.service = service
+        self.config = config
+        self.on_create = on_create
+        self.endpoint_url = endpoint_url
+        self._client = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def get(self):
+        client = self._client
+        if client is not None:
+            return client
+        with self._lock:
+            if self._client is None:
+                import boto3
+                config = self.config() if callable(self.config) else self.config
+                client = boto3.session.Session().client(
+                    self.service,
+                    config=config,
+                    endpoint_url=self.endpoint_url
+                )
+                if self.on_create is not None:
+                    self.on_create(client)
+                self._client = client
+            return self._client
+
+    def reset(self):
+        with self._lock:
+            self._client = None
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._client = None
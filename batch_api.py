@@ -0,0 +1,145 @@
+import json
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from text_rules import RuleSet
+
+
+class BatchRequestError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# Rule set of a pool worker process, compiled once by the initializer
+_worker_rule_set = None
+
+
+def _init_worker(rules):
+    global _worker_rule_set
+    _worker_rule_set = RuleSet(rules)
+
+
+def _process_chunk(texts):
+    return [_worker_rule_set.apply(text) for text in texts]
+
+
+# Applies a rule set to a stream of (id, text) documents. Documents are
+# grouped into chunks that are fanned out across a process pool; at most
+# max_inflight chunks are queued at once, and results are yielded in input
+# order, so a slow reader of the output throttles how much work is queued.
+#
+# Server worker processes run other threads (metadata sync, job pools, the
+# change feed) that may hold locks at any moment, so pool processes are
+# started from a forkserver instead of forking the server process. Like
+# with spawn, they import the main module, which therefore needs the usual
+# `if __name__ == '__main__'` guard.
+class BatchProcessor:
+    def __init__(self, rule_set, workers, chunk_size, max_inflight, start_method='forkserver'):
+        self.rule_set = rule_set
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_inflight = max(1, max_inflight)
+        self.start_method = start_method
+        self._pool = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # A pool inherited from the parent belongs to the parent
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def process(self, documents):
+        pending = deque()
+        for chunk in _chunks(documents, self.chunk_size):
+            if self.workers <= 0:
+                yield from self._emit(chunk, [self.rule_set.apply(text) for _, text in chunk])
+                continue
+            future = self._get_pool().submit(_process_chunk, [text for _, text in chunk])
+            pending.append((chunk, future))
+            while len(pending) >= self.max_inflight:
+                done_chunk, done_future = pending.popleft()
+                yield from self._emit(done_chunk, done_future.result())
+        while pending:
+            done_chunk, done_future = pending.popleft()
+            yield from self._emit(done_chunk, done_future.result())
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def _emit(self, chunk, results):
+        for (doc_id, _), text in zip(chunk, results):
+            yield doc_id, text
+
+    def _get_pool(self):
+        # Created on first use and kept, so each server worker process starts
+        # one pool
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(list(self.rule_set.rules.items()),)
+                )
+            return self._pool
+
+
+def _chunks(documents, size):
+    chunk = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _document(item, index):
+    if isinstance(item, str):
+        return index, item
+    if isinstance(item, dict) and isinstance(item.get('text'), str):
+        return item.get('id', index), item['text']
+    raise BatchRequestError(f"Document {index} must be a string or an object with a 'text' string")
+
+
+# JSON body: a list of documents or {"documents": [...]}. A document is a
+# string or {"id": ..., "text": "..."}.
+def parse_json_documents(body, max_documents):
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise BatchRequestError(f"Invalid JSON: {e}")
+    if isinstance(payload, dict):
+        payload = payload.get('documents')
+    if not isinstance(payload, list):
+        raise BatchRequestError("Expected a list of documents or an object with a 'documents' list")
+    if len(payload) > max_documents:
+        raise BatchRequestError(f"Too many documents (limit {max_documents})", status=413)
+    return [_document(item, index) for index, item in enumerate(payload)]
+
+
+# NDJSON body: one document per line, parsed lazily as the body is read
+def iter_ndjson_documents(lines, max_documents):
+    index = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if index >= max_documents:
+            raise BatchRequestError(f"Too many documents (limit {max_documents})", status=413)
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            raise BatchRequestError(f"Invalid JSON on document {index}: {e}")
+        yield _document(item, index)
+        index += 1
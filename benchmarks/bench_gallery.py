@@ -0,0 +1,161 @@
+# Gallery scaling benchmark against the in-memory S3 stand-in. Runs fully
+# offline: a fake_s3.py subprocess is seeded with buckets of each size and
+# the app's real listing, signing and rendering code is timed against it.
+#
+#   python benchmarks/bench_gallery.py [--sizes 10,1000,10000,100000]
+#                                      [--json] [--output results.json]
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+
+def start_fake_s3(sizes):
+    command = [sys.executable, os.path.join(HERE, 'fake_s3.py'), '--port', '0']
+    for size in sizes:
+        command += ['--seed', f"bench-{size}:{size}"]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line:
+        process.kill()
+        raise RuntimeError('fake_s3.py did not start')
+    return process, line.strip().rsplit(' ', 1)[-1]
+
+
+def configure_environment(endpoint):
+    os.environ.update({
+        'S3_ENDPOINT_URL': endpoint,
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'S3_BUCKET_NAME': 'bench-0',
+        'THUMBNAIL_MODE': 'off',
+        'GALLERY_EVENTS_MODE': 'off',
+        'PRESIGN_CACHE_MAX_BYTES': str(1024 * 1024 * 1024),
+    })
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def payload_bytes(children):
+    from plotly.utils import PlotlyJSONEncoder
+    response = {'multi': True, 'response': {'s3-images': {'children': children}}}
+    return len(json.dumps(response, cls=PlotlyJSONEncoder).encode('utf-8'))
+
+
+def run_once(app, bucket):
+    app.s3_bucket_name = bucket
+    app.s3_list_cache.invalidate()
+    app.presigned_url_cache.clear()
+
+    list_seconds, keys = timed(app.get_s3_image_keys)
+    page_keys = keys[:app.gallery_page_size]
+    sign_page_seconds, page_images = timed(lambda: app.sign_s3_images(page_keys))
+    app.presigned_url_cache.clear()
+    sign_all_seconds, images = timed(lambda: app.sign_s3_images(keys))
+    sign_all_warm_seconds, _ = timed(lambda: app.sign_s3_images(keys))
+    render_page_seconds, page_items = timed(lambda: app.render_gallery_items(page_images))
+    render_all_seconds, all_items = timed(lambda: app.render_gallery_items(images))
+
+    return {
+        'image_keys': len(keys),
+        'list_seconds': list_seconds,
+        'sign_page_seconds': sign_page_seconds,
+        'sign_all_seconds': sign_all_seconds,
+        'sign_all_warm_seconds': sign_all_warm_seconds,
+        'render_page_seconds': render_page_seconds,
+        'render_all_seconds': render_all_seconds,
+        'payload_page_bytes': payload_bytes(page_items),
+        'payload_all_bytes': payload_bytes(all_items),
+    }
+
+
+def peak_memory(app, bucket):
+    # Separate pass, since tracing allocations slows everything down
+    app.s3_bucket_name = bucket
+    app.s3_list_cache.invalidate()
+    app.presigned_url_cache.clear()
+    tracemalloc.start()
+    keys = app.get_s3_image_keys()
+    app.render_gallery_items(app.sign_s3_images(keys))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gallery scaling benchmark')
+    parser.add_argument('--sizes', default='10,1000,10000,100000',
+                        help='comma-separated bucket sizes (total keys, mixed extensions)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per size; the fastest is kept')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    parser.add_argument('--output', help='also write JSON results to this file')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    process, endpoint = start_fake_s3(sizes)
+    try:
+        configure_environment(endpoint)
+        import app
+
+        results = []
+        for size in sizes:
+            bucket = f"bench-{size}"
+            runs = [run_once(app, bucket) for _ in range(args.repeat)]
+            best = {
+                key: min(run[key] for run in runs) if key.endswith('_seconds') else runs[0][key]
+                for key in runs[0]
+            }
+            best['bucket_keys'] = size
+            best['peak_memory_bytes'] = peak_memory(app, bucket)
+            results.append(best)
+    finally:
+        process.terminate()
+        process.wait()
+
+    report = {
+        'benchmark': 'gallery',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'page_size': app.gallery_page_size,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'keys':>8} {'images':>7} {'list ms':>9} {'sign pg ms':>11} {'sign all ms':>12} "
+          f"{'render all ms':>14} {'page KB':>8} {'all KB':>9} {'peak MB':>8}")
+    for r in results:
+        print(f"{r['bucket_keys']:>8} {r['image_keys']:>7} {r['list_seconds'] * 1000:>9.1f} "
+              f"{r['sign_page_seconds'] * 1000:>11.2f} {r['sign_all_seconds'] * 1000:>12.1f} "
+              f"{r['render_all_seconds'] * 1000:>14.1f} {r['payload_page_bytes'] / 1024:>8.1f} "
+              f"{r['payload_all_bytes'] / 1024:>9.1f} {r['peak_memory_bytes'] / 1048576:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
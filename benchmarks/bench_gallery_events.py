@@ -0,0 +1,188 @@
+# Gallery change-feed benchmark, fully offline. fake_s3.py publishes every
+# upload and delete to a GALLERY_EVENTS_MODE=local event directory; several
+# app processes (standing in for server workers) share one change log, and
+# one event stream is opened to each. Objects are then uploaded and deleted
+# and the time until every process has pushed each delta is reported.
+#
+#   python benchmarks/bench_gallery_events.py [--workers 3] [--changes 20]
+#                                             [--json] [--output results.json]
+#
+# Exits non-zero when a process missed a delta, since every worker must see
+# every change whichever one read it from the feed.
+import argparse
+import json
+import os
+import platform
+import queue
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUCKET = 'bench-events'
+
+CHILD = '''
+import sys
+sys.path.insert(0, {root!r})
+from wsgi import application
+from werkzeug.serving import make_server
+server = make_server('127.0.0.1', {port}, application, threaded=True)
+print('ready', flush=True)
+server.serve_forever()
+'''
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_fake_s3(events_dir):
+    command = [sys.executable, os.path.join(HERE, 'fake_s3.py'), '--port', '0',
+               '--seed', f"{BUCKET}:10", '--events-dir', events_dir]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line:
+        process.kill()
+        raise RuntimeError('fake_s3.py did not start')
+    return process, line.strip().rsplit(' ', 1)[-1]
+
+
+def start_worker(environment):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-c', CHILD.format(root=ROOT, port=port)],
+        env=environment, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    while process.stdout.readline().strip() != 'ready':
+        if process.poll() is not None:
+            raise RuntimeError('app process did not start')
+    return process, f"http://127.0.0.1:{port}"
+
+
+# Reads one event stream, putting (arrival time, delta) on received
+def follow(base_url, received, connected):
+    # Any first request starts the process's change-feed thread
+    urllib.request.urlopen(base_url + '/healthz', timeout=30).read()
+    with urllib.request.urlopen(base_url + '/events/gallery', timeout=60) as response:
+        connected.set()
+        for line in response:
+            line = line.decode('utf-8').strip()
+            if line.startswith('data: '):
+                received.put((time.perf_counter(), json.loads(line[len('data: '):])))
+
+
+def s3_request(endpoint, method, key, body=b''):
+    request = urllib.request.Request(f"{endpoint}/{BUCKET}/{key}", data=body if method == 'PUT' else None,
+                                     method=method)
+    urllib.request.urlopen(request, timeout=30).read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gallery change-feed benchmark')
+    parser.add_argument('--workers', type=int, default=3, help='app processes sharing the change log')
+    parser.add_argument('--changes', type=int, default=20, help='uploads (each followed by a delete)')
+    parser.add_argument('--timeout', type=float, default=15, help='seconds to wait for each delta')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    parser.add_argument('--output', help='also write JSON results to this file')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench-events-')
+    events_dir = os.path.join(work_dir, 'events')
+    fake_s3, endpoint = start_fake_s3(events_dir)
+    environment = dict(
+        os.environ,
+        S3_ENDPOINT_URL=endpoint,
+        AWS_ACCESS_KEY_ID='benchmark',
+        AWS_SECRET_ACCESS_KEY='benchmark',
+        S3_BUCKET_NAME=BUCKET,
+        THUMBNAIL_MODE='off',
+        GALLERY_EVENTS_MODE='local',
+        GALLERY_EVENTS_DIR=events_dir,
+        GALLERY_EVENTS_LOG_PATH=os.path.join(work_dir, 'events.sqlite3'),
+        JOB_STORE_DIR=os.path.join(work_dir, 'jobs'),
+    )
+    workers = []
+    try:
+        streams = []
+        for _ in range(args.workers):
+            process, base_url = start_worker(environment)
+            workers.append(process)
+            received, connected = queue.Queue(), threading.Event()
+            threading.Thread(target=follow, args=(base_url, received, connected), daemon=True).start()
+            if not connected.wait(30):
+                raise RuntimeError(f"could not open the event stream of {base_url}")
+            streams.append(received)
+
+        latencies = []
+        missed = 0
+        for i in range(args.changes):
+            key = f"photos/new/image-{i:04d}.png"
+            for method, field in (('PUT', 'added'), ('DELETE', 'removed')):
+                sent = time.perf_counter()
+                s3_request(endpoint, method, key, b'png')
+                for received in streams:
+                    deadline = sent + args.timeout
+                    while True:
+                        try:
+                            arrived, delta = received.get(timeout=max(deadline - time.perf_counter(), 0))
+                        except queue.Empty:
+                            missed += 1
+                            break
+                        items = delta.get(field) or []
+                        if field == 'removed' and key in items or field == 'added' and items:
+                            latencies.append(arrived - sent)
+                            break
+    finally:
+        for process in workers:
+            process.terminate()
+            process.wait()
+        fake_s3.terminate()
+        fake_s3.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    latencies.sort()
+    report = {
+        'benchmark': 'gallery_events',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'workers': args.workers,
+        'deltas_expected': 2 * args.changes * args.workers,
+        'deltas_missed': missed,
+        'latency_p50_seconds': statistics.median(latencies) if latencies else None,
+        'latency_max_seconds': latencies[-1] if latencies else None,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"workers           {report['workers']}")
+        print(f"deltas delivered  {report['deltas_expected'] - missed} / {report['deltas_expected']}")
+        if latencies:
+            print(f"latency p50       {report['latency_p50_seconds'] * 1000:8.1f} ms")
+            print(f"latency max       {report['latency_max_seconds'] * 1000:8.1f} ms")
+    sys.exit(1 if missed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# Cold-start benchmark. Each run starts a fresh interpreter that imports
+# the app the way wsgi.py does and serves it on a local port, and reports:
+#
+#   - wall time and resident memory added by `import app`
+#   - which heavy modules that import pulled in (they should load on first use)
+#   - time from process start to the first response of GET / and of the
+#     first /_dash-layout, which also pays for Dash's first-request setup
+#
+#   python benchmarks/bench_startup.py [--repeat 5] [--json] [--output results.json]
+#
+# Without a .env file or AWS settings nothing talks to AWS; S3 stays
+# unconfigured and the numbers cover the app itself.
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should not be imported until they are needed
+LAZY_MODULES = ('boto3', 'botocore', 'PIL.Image', 'dotenv', 'plotly.utils')
+
+CHILD = '''
+import json, os, resource, sys, time
+started = time.perf_counter()
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+modules_before = len(sys.modules)
+sys.path.insert(0, {root!r})
+from wsgi import application
+import_seconds = time.perf_counter() - started
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    'import_seconds': import_seconds,
+    'import_rss_bytes': (rss_after - rss_before) * 1024,
+    'modules_imported': len(sys.modules) - modules_before,
+    'eager_modules': [name for name in {lazy!r} if name in sys.modules],
+}}), flush=True)
+from werkzeug.serving import make_server
+make_server('127.0.0.1', {port}, application, threaded=True).serve_forever()
+'''
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, started, timeout):
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                response.read()
+                return time.perf_counter() - started
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"{url} returned HTTP {e.code}")
+        except OSError:
+            # Not listening yet
+            time.sleep(0.005)
+    raise RuntimeError(f"no response from {url} after {timeout}s")
+
+
+def run_once(timeout):
+    port = free_port()
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-c', CHILD.format(root=ROOT, lazy=LAZY_MODULES, port=port)],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        first_response = wait_for(base + '/', started, timeout)
+        first_layout = wait_for(base + '/_dash-layout', started, timeout)
+        # The JSON line comes before serving starts, after the app's own
+        # startup output
+        line = process.stdout.readline()
+        while line and not line.startswith('{'):
+            line = process.stdout.readline()
+        result = json.loads(line)
+    finally:
+        process.terminate()
+        process.wait()
+    result['first_response_seconds'] = first_response
+    result['first_layout_seconds'] = first_layout
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import and time-to-first-response benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh processes to start; medians are reported')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for the server')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    parser.add_argument('--output', help='also write JSON results to this file')
+    args = parser.parse_args()
+
+    # One unmeasured run warms the OS file cache (and writes no bytecode)
+    run_once(args.timeout)
+    runs = [run_once(args.timeout) for _ in range(args.repeat)]
+    summary = {
+        key: statistics.median(run[key] for run in runs)
+        for key in runs[0] if key != 'eager_modules'
+    }
+    summary['eager_modules'] = sorted({name for run in runs for name in run['eager_modules']})
+
+    report = {
+        'benchmark': 'startup',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'repeat': args.repeat,
+        'summary': summary,
+        'runs': runs,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"import app          {summary['import_seconds'] * 1000:8.1f} ms  (median of {args.repeat})")
+    print(f"import memory       {summary['import_rss_bytes'] / 1024 / 1024:8.1f} MB  "
+          f"({summary['modules_imported']:.0f} modules)")
+    print(f"first response      {summary['first_response_seconds'] * 1000:8.1f} ms  (GET /, from process start)")
+    print(f"first layout        {summary['first_layout_seconds'] * 1000:8.1f} ms  (GET /_dash-layout)")
+    print(f"eager heavy modules {', '.join(summary['eager_modules']) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# Microbenchmark: compiled RuleSet against the chained str.replace approach
+# process_text used before.
+#
+#   python benchmarks/bench_text_rules.py [--size BYTES] [--rules N] [--json]
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_rules import DEFAULT_RULES, RuleSet
+
+
+def chained_replace(rules):
+    def apply(text):
+        for pattern, replacement in rules:
+            text = text.replace(pattern, replacement)
+        return text
+    return apply
+
+
+def make_text(size, seed=0):
+    rng = random.Random(seed)
+    words = []
+    length = 0
+    while length < size:
+        word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10)))
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:size]
+
+
+def make_rules(count, seed=1):
+    # Multi-character patterns whose replacements never contain letters, so
+    # sequential and single-pass application give the same result
+    rng = random.Random(seed)
+    rules = {}
+    while len(rules) < count:
+        pattern = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 4)))
+        rules[pattern] = f"<{len(rules)}>"
+    # Longest first so the chain approximates leftmost-longest matching
+    return sorted(rules.items(), key=lambda rule: -len(rule[0]))
+
+
+def best_of(func, text, repeat, number):
+    return min(timeit.repeat(lambda: func(text), repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare RuleSet with chained str.replace')
+    parser.add_argument('--size', type=int, default=1_000_000, help='input size in characters')
+    parser.add_argument('--rules', type=int, default=500, help='size of the large rule set')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    text = make_text(args.size)
+    large_rules = make_rules(args.rules)
+    cases = [
+        ('builtin', DEFAULT_RULES),
+        (f'{args.rules}-rules', large_rules),
+    ]
+
+    results = []
+    for name, rules in cases:
+        compiled = RuleSet(rules)
+        chained = chained_replace(rules)
+        if name == 'builtin':
+            assert compiled.apply(text) == chained(text)
+        results.append({
+            'case': name,
+            'input_chars': len(text),
+            'rules': len(compiled),
+            'chained_seconds': best_of(chained, text, args.repeat, args.number),
+            'compiled_seconds': best_of(compiled.apply, text, args.repeat, args.number),
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'case':<12} {'rules':>6} {'chained (ms)':>14} {'compiled (ms)':>14} {'speedup':>8}")
+    for r in results:
+        print(f"{r['case']:<12} {r['rules']:>6} {r['chained_seconds'] * 1000:>14.2f} "
+              f"{r['compiled_seconds'] * 1000:>14.2f} "
+              f"{r['chained_seconds'] / r['compiled_seconds']:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
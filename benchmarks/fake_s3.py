@@ -0,0 +1,258 @@
+# Minimal in-memory S3 stand-in for offline benchmarks and load tests.
+# Serves path-style ListObjectsV2 (pagination, Prefix, Delimiter),
+# HeadBucket, HeadObject, GetObject (with Range and If-None-Match),
+# PutObject and DeleteObject.
+#
+#   python benchmarks/fake_s3.py --port 9000 --seed images:1000
+#
+# then point the app at it with S3_ENDPOINT_URL=http://127.0.0.1:9000 and
+# any dummy AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY. With --events-dir,
+# every PutObject and DeleteObject is also published as an S3 event for an
+# app running with GALLERY_EVENTS_MODE=local and the same GALLERY_EVENTS_DIR.
+import argparse
+import bisect
+import hashlib
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bucket_events import publish_local_event
+
+SEED_EXTENSIONS = ('.jpg', '.png', '.gif', '.webp', '.svg', '.jpeg', '.txt', '.pdf', '.json', '.csv')
+MAX_KEYS = 1000
+
+
+class Bucket:
+    def __init__(self):
+        self.objects = {}  # key -> (body, etag, last_modified, content_type)
+        self.keys = []  # sorted
+        self.lock = threading.Lock()
+
+    def put(self, key, body, content_type='application/octet-stream'):
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        with self.lock:
+            if key not in self.objects:
+                bisect.insort(self.keys, key)
+            self.objects[key] = (body, etag, datetime.now(timezone.utc), content_type)
+
+    def delete(self, key):
+        with self.lock:
+            if self.objects.pop(key, None) is not None:
+                self.keys.pop(bisect.bisect_left(self.keys, key))
+
+
+class FakeS3:
+    def __init__(self, events_dir=None):
+        self.buckets = {}
+        self.events_dir = events_dir
+        if events_dir:
+            os.makedirs(events_dir, exist_ok=True)
+
+    def publish(self, event_type, name, key, etag=None):
+        if self.events_dir:
+            publish_local_event(self.events_dir, event_type, name, key, etag and etag.strip('"'))
+
+    def bucket(self, name, create=False):
+        if create:
+            return self.buckets.setdefault(name, Bucket())
+        return self.buckets.get(name)
+
+    def seed(self, name, count, body=b'', extensions=SEED_EXTENSIONS):
+        bucket = self.bucket(name, create=True)
+        for i in range(count):
+            ext = extensions[i % len(extensions)]
+            bucket.put(f"photos/{i // 1000:04d}/image-{i:07d}{ext}", body)
+        return bucket
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _target(self):
+            parts = urlsplit(self.path)
+            path = unquote(parts.path).lstrip('/')
+            name, _, key = path.partition('/')
+            return name, key, parse_qs(parts.query, keep_blank_values=True)
+
+        def _send(self, status, body=b'', headers=None, head=False):
+            self.send_response(status)
+            for header, value in (headers or {}).items():
+                self.send_header(header, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+
+        def _error(self, status, code, head=False):
+            body = f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>{code}</Code></Error>".encode()
+            self._send(status, b'' if head else body, {'Content-Type': 'application/xml'}, head)
+
+        def do_HEAD(self):
+            name, key, _ = self._target()
+            bucket = store.bucket(name)
+            if bucket is None:
+                return self._error(404, 'NoSuchBucket', head=True)
+            if not key:
+                return self._send(200, head=True)
+            obj = bucket.objects.get(key)
+            if obj is None:
+                return self._error(404, 'NoSuchKey', head=True)
+            self._send(200, obj[0], self._object_headers(obj), head=True)
+
+        def do_GET(self):
+            name, key, query = self._target()
+            bucket = store.bucket(name)
+            if bucket is None:
+                return self._error(404, 'NoSuchBucket')
+            if not key:
+                return self._list(name, bucket, query)
+            obj = bucket.objects.get(key)
+            if obj is None:
+                return self._error(404, 'NoSuchKey')
+            headers = self._object_headers(obj)
+            if self.headers.get('If-None-Match') == obj[1]:
+                return self._send(304, headers=headers, head=True)
+            match = re.fullmatch(r'bytes=(\d*)-(\d*)', self.headers.get('Range', ''))
+            if match and any(match.groups()):
+                size = len(obj[0])
+                if match.group(1):
+                    start = int(match.group(1))
+                    end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                else:
+                    start, end = max(size - int(match.group(2)), 0), size - 1
+                if start >= size:
+                    return self._error(416, 'InvalidRange')
+                headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+                return self._send(206, obj[0][start:end + 1], headers)
+            self._send(200, obj[0], headers)
+
+        def do_PUT(self):
+            name, key, _ = self._target()
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length)
+            bucket = store.bucket(name, create=not key)
+            if bucket is None:
+                return self._error(404, 'NoSuchBucket')
+            if key:
+                bucket.put(key, body, self.headers.get('Content-Type', 'application/octet-stream'))
+                etag = bucket.objects[key][1]
+                store.publish('added', name, key, etag)
+                return self._send(200, headers={'ETag': etag})
+            self._send(200)
+
+        def do_DELETE(self):
+            name, key, _ = self._target()
+            bucket = store.bucket(name)
+            if bucket is None:
+                return self._error(404, 'NoSuchBucket')
+            bucket.delete(key)
+            store.publish('removed', name, key)
+            self._send(204)
+
+        def _object_headers(self, obj):
+            return {
+                'ETag': obj[1],
+                'Last-Modified': formatdate(obj[2].timestamp(), usegmt=True),
+                'Content-Type': obj[3],
+            }
+
+        def _list(self, name, bucket, query):
+            prefix = query.get('prefix', [''])[0]
+            delimiter = query.get('delimiter', [''])[0]
+            token = query.get('continuation-token', [''])[0] or query.get('start-after', [''])[0]
+            max_keys = min(int(query.get('max-keys', [MAX_KEYS])[0]), MAX_KEYS)
+
+            with bucket.lock:
+                keys = bucket.keys
+                start = bisect.bisect_right(keys, token) if token else bisect.bisect_left(keys, prefix)
+                contents = []
+                prefixes = []
+                last = None
+                i = start
+                while i < len(keys) and len(contents) + len(prefixes) < max_keys:
+                    key = keys[i]
+                    if not key.startswith(prefix):
+                        break
+                    if delimiter:
+                        cut = key.find(delimiter, len(prefix))
+                        if cut != -1:
+                            common = key[:cut + len(delimiter)]
+                            prefixes.append(common)
+                            last = common + '\U0010ffff'
+                            i = bisect.bisect_right(keys, last)
+                            continue
+                    contents.append((key, bucket.objects[key]))
+                    last = key
+                    i += 1
+                truncated = i < len(keys) and keys[i].startswith(prefix)
+
+            parts = [
+                '<?xml version="1.0" encoding="UTF-8"?>',
+                '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">',
+                f"<Name>{escape(name)}</Name><Prefix>{escape(prefix)}</Prefix>",
+                f"<KeyCount>{len(contents) + len(prefixes)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>",
+                f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>",
+            ]
+            if delimiter:
+                parts.append(f"<Delimiter>{escape(delimiter)}</Delimiter>")
+            if truncated:
+                parts.append(f"<NextContinuationToken>{escape(last)}</NextContinuationToken>")
+            for key, (body, etag, modified, _) in contents:
+                parts.append(
+                    f"<Contents><Key>{escape(key)}</Key>"
+                    f"<LastModified>{modified.strftime('%Y-%m-%dT%H:%M:%S.000Z')}</LastModified>"
+                    f"<ETag>{escape(etag)}</ETag><Size>{len(body)}</Size>"
+                    f"<StorageClass>STANDARD</StorageClass></Contents>"
+                )
+            for common in prefixes:
+                parts.append(f"<CommonPrefixes><Prefix>{escape(common)}</Prefix></CommonPrefixes>")
+            parts.append('</ListBucketResult>')
+            self._send(200, ''.join(parts).encode('utf-8'), {'Content-Type': 'application/xml'})
+
+    return Handler
+
+
+def serve(store, host='127.0.0.1', port=0):
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='fake-s3', daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='In-memory S3 stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--seed', action='append', default=[], metavar='BUCKET:COUNT',
+                        help='create BUCKET with COUNT keys of mixed extensions')
+    parser.add_argument('--events-dir', help='publish object changes here for GALLERY_EVENTS_MODE=local')
+    args = parser.parse_args()
+
+    store = FakeS3(args.events_dir)
+    for spec in args.seed:
+        name, _, count = spec.partition(':')
+        store.seed(name, int(count or 0))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store))
+    server.daemon_threads = True
+    print(f"Fake S3 listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
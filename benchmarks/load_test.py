@@ -0,0 +1,391 @@
+# Concurrent load generator for the Dash callback endpoint. Each virtual
+# user replays a realistic session against /_dash-update-component: page
+# load (layout, dependencies and initial callbacks), a language switch,
+# typing into input-text, a Process click and a switch back, following the
+# same callback chains and polling intervals the browser would.
+#
+#   python benchmarks/load_test.py --url http://localhost:8050 --users 20 --duration 60
+#   python benchmarks/load_test.py --fake-s3 1000 --users 10 --sessions 5
+#
+# Without --url the app is imported and driven in-process through the Flask
+# test client; --fake-s3 then starts benchmarks/fake_s3.py seeded with that
+# many keys so the gallery path is exercised without AWS.
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLE_TEXT = (
+    "The quick brown fox jumps over the lazy dog. "
+    "Pack my box with five dozen liquor jugs. "
+    "How vexingly quick daft zebras jump!"
+)
+MAX_CHAIN_DEPTH = 5
+
+
+class HttpTransport:
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.connection_class = (
+            http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        )
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        # One keep-alive connection per virtual user, like a browser tab
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        try:
+            connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            raise
+
+
+class InProcessTransport:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.server.test_client()
+        response = client.open(path, method=method, data=body,
+                               content_type='application/json' if body is not None else None)
+        return response.status_code, response.get_data()
+
+    def label(self, output):
+        callback = self.app.callback_map.get(output, {}).get('callback')
+        return getattr(callback, '__name__', None)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}  # label -> [seconds]
+        self.errors = {}  # label -> count
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(label, []).append(seconds)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def split_output(output):
+    # '..a.children...b.style..' or 'a.children' -> [('a', 'children'), ...]
+    specs = output[2:-2].split('...') if output.startswith('..') else [output]
+    return [tuple(spec.rsplit('.', 1)) for spec in specs]
+
+
+class Session:
+    def __init__(self, transport, stats, rng, think, poll_scale, max_polls):
+        self.transport = transport
+        self.stats = stats
+        self.rng = rng
+        self.think = think
+        self.poll_scale = poll_scale
+        self.max_polls = max_polls
+        self.props = {}
+        self.intervals = set()
+        self.callbacks = []
+
+    def request(self, label, method, path, body=None):
+        started = time.perf_counter()
+        try:
+            status, data = self.transport.request(method, path, body)
+        except Exception as e:
+            self.stats.record(label, time.perf_counter() - started, False)
+            print(f"ERROR: {label}: {type(e).__name__}: {e}")
+            return None, None
+        # 204 is Dash's "no update" (PreventUpdate) and counts as success
+        self.stats.record(label, time.perf_counter() - started, status in (200, 204))
+        return status, data
+
+    def get_json(self, label, path):
+        status, data = self.request(label, 'GET', path)
+        return json.loads(data) if status == 200 else None
+
+    def walk_layout(self, node):
+        if isinstance(node, list):
+            for child in node:
+                self.walk_layout(child)
+            return
+        if not isinstance(node, dict) or 'props' not in node:
+            return
+        props = node['props']
+        if isinstance(props.get('id'), str):
+            self.props[props['id']] = {k: v for k, v in props.items() if k != 'children'}
+            self.props[props['id']]['children'] = props.get('children')
+            if node.get('type') == 'Interval':
+                self.intervals.add(props['id'])
+        self.walk_layout(props.get('children'))
+
+    def value(self, component_id, prop):
+        return self.props.get(component_id, {}).get(prop)
+
+    def load_page(self):
+        self.props = {}
+        self.intervals = set()
+        self.request('GET /', 'GET', '/')
+        layout = self.get_json('GET /_dash-layout', '/_dash-layout')
+        dependencies = self.get_json('GET /_dash-dependencies', '/_dash-dependencies')
+        if layout is None or dependencies is None:
+            return False
+        self.walk_layout(layout)
+        self.callbacks = [
+            cb for cb in dependencies
+            if not cb.get('clientside_function')
+            and all(isinstance(dep['id'], str) for dep in cb['inputs'] + cb.get('state', []))
+        ]
+        initial = [cb for cb in self.callbacks if not cb.get('prevent_initial_call')]
+        enabled = self.fire(initial, [], 0)
+        # Intervals the layout itself switched on (e.g. a gallery page started
+        # while rendering it) are polled too, if some callback turns them off
+        switchable = {
+            component_id for cb in self.callbacks
+            for component_id, prop in split_output(cb['output']) if prop.split('@')[0] == 'disabled'
+        }
+        enabled |= {
+            component_id for component_id in self.intervals & switchable
+            if not self.value(component_id, 'disabled')
+        }
+        self.poll(enabled)
+        return True
+
+    def fire(self, callbacks, changed, depth):
+        enabled = set()
+        for cb in callbacks:
+            updated = self.call(cb, changed)
+            for component_id, prop in updated:
+                if component_id in self.intervals and prop == 'disabled' \
+                        and not self.value(component_id, 'disabled'):
+                    enabled.add(component_id)
+            # Outputs that feed other server callbacks trigger them, as in the browser
+            chained = [f"{component_id}.{prop}" for component_id, prop in updated]
+            if chained and depth < MAX_CHAIN_DEPTH:
+                enabled |= self.set_props({}, chained, depth + 1)
+        return enabled
+
+    def call(self, cb, changed):
+        def spec(dep):
+            return {'id': dep['id'], 'property': dep['property'],
+                    'value': self.value(dep['id'], dep['property'])}
+
+        body = json.dumps({
+            'output': cb['output'],
+            'inputs': [spec(dep) for dep in cb['inputs']],
+            'state': [spec(dep) for dep in cb.get('state', [])],
+            'changedPropIds': changed,
+        })
+        label = getattr(self.transport, 'label', lambda output: None)(cb['output']) or \
+            ','.join(dict.fromkeys(component_id for component_id, _ in split_output(cb['output'])))
+        status, data = self.request(label, 'POST', '/_dash-update-component', body)
+        if status != 200:
+            return []
+        updated = []
+        for component_id, props in json.loads(data).get('response', {}).items():
+            for prop, value in props.items():
+                prop = prop.split('@')[0]
+                # Patch objects are applied client-side; the session only
+                # tracks plain values
+                if isinstance(value, dict) and '__dash_patch_update' in value:
+                    continue
+                self.props.setdefault(component_id, {})[prop] = value
+                updated.append((component_id, prop))
+        return updated
+
+    def set_props(self, values, changed=None, depth=0):
+        for key, value in values.items():
+            component_id, prop = key.rsplit('.', 1)
+            self.props.setdefault(component_id, {})[prop] = value
+        changed = list(values) + list(changed or [])
+        triggered = [
+            cb for cb in self.callbacks
+            if any(f"{dep['id']}.{dep['property']}" in changed for dep in cb['inputs'])
+        ]
+        return self.fire(triggered, changed, depth)
+
+    def poll(self, enabled):
+        # Tick intervals a response switched on until a response disables them
+        for component_id in sorted(enabled):
+            for _ in range(self.max_polls):
+                if self.value(component_id, 'disabled'):
+                    break
+                interval = (self.value(component_id, 'interval') or 1000) / 1000
+                time.sleep(interval * self.poll_scale)
+                n = (self.value(component_id, 'n_intervals') or 0) + 1
+                self.set_props({f"{component_id}.n_intervals": n})
+
+    def act(self, values):
+        time.sleep(self.rng.uniform(0.5, 1.5) * self.think)
+        self.poll(self.set_props(values))
+
+    def run(self):
+        if not self.load_page():
+            time.sleep(max(self.think, 0.1))
+            return
+        languages = [
+            option['value'] if isinstance(option, dict) else option
+            for option in self.value('lang-dropdown', 'options') or []
+        ]
+        initial_language = self.value('lang-dropdown', 'value')
+        if languages:
+            self.act({'lang-dropdown.value': self.rng.choice(languages)})
+
+        # Typing: a few characters per keystroke burst, then the debounce tick
+        text = SAMPLE_TEXT[:self.rng.randint(20, len(SAMPLE_TEXT))]
+        for end in range(5, len(text) + 5, 5):
+            time.sleep(self.rng.uniform(0.05, 0.15) * self.think)
+            self.set_props({'input-text.value': text[:end]})
+        if 'process-debounce' in self.props:
+            n = (self.value('process-debounce', 'n_intervals') or 0) + 1
+            self.act({'process-debounce.n_intervals': n})
+
+        clicks = (self.value('process-button', 'n_clicks') or 0) + 1
+        self.act({'process-button.n_clicks': clicks})
+        if initial_language is not None:
+            self.act({'lang-dropdown.value': initial_language})
+        self.stats.session_done()
+
+
+def virtual_user(transport, stats, args, index, deadline):
+    rng = random.Random(args.seed + index)
+    sessions = 0
+    while (args.sessions and sessions < args.sessions) or (not args.sessions and time.monotonic() < deadline):
+        Session(transport, stats, rng, args.think_ms / 1000, args.poll_scale, args.max_polls).run()
+        sessions += 1
+
+
+def summarize(stats, elapsed):
+    rows = []
+    total = errors = 0
+    for label, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        failed = stats.errors.get(label, 0)
+        total += len(values)
+        errors += failed
+        rows.append({
+            'name': label,
+            'requests': len(values),
+            'errors': failed,
+            'error_rate': failed / len(values),
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': values[-1] * 1000,
+        })
+    return {
+        'elapsed_seconds': elapsed,
+        'sessions': stats.sessions,
+        'requests': total,
+        'errors': errors,
+        'error_rate': errors / total if total else 0.0,
+        'requests_per_second': total / elapsed if elapsed else 0.0,
+        'sessions_per_second': stats.sessions / elapsed if elapsed else 0.0,
+        'callbacks': rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dash callback load generator')
+    parser.add_argument('--url', help='base URL of a running app; omit to drive app.py in-process')
+    parser.add_argument('--users', type=int, default=10, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run when --sessions is not set')
+    parser.add_argument('--sessions', type=int, default=0, help='sessions per user (overrides --duration)')
+    parser.add_argument('--think-ms', type=float, default=200, help='mean pause between user actions')
+    parser.add_argument('--poll-scale', type=float, default=1.0,
+                        help='multiplier for dcc.Interval periods while polling')
+    parser.add_argument('--max-polls', type=int, default=50, help='interval ticks per action before giving up')
+    parser.add_argument('--fake-s3', type=int, metavar='COUNT',
+                        help='in-process only: serve a fake bucket with COUNT keys')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for session variation')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    parser.add_argument('--output', help='also write JSON results to this file')
+    args = parser.parse_args()
+
+    fake_s3 = None
+    if args.url:
+        transport = HttpTransport(args.url)
+    else:
+        if args.fake_s3 is not None:
+            from bench_gallery import configure_environment, start_fake_s3
+            fake_s3, endpoint = start_fake_s3([args.fake_s3])
+            configure_environment(endpoint)
+            os.environ['S3_BUCKET_NAME'] = f"bench-{args.fake_s3}"
+        import app
+        transport = InProcessTransport(app.app)
+
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(target=virtual_user, args=(transport, stats, args, i, deadline), daemon=True)
+        for i in range(args.users)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if fake_s3 is not None:
+            fake_s3.terminate()
+            fake_s3.wait()
+
+    report = summarize(stats, time.monotonic() - started)
+    report.update({
+        'benchmark': 'load',
+        'target': args.url or 'in-process',
+        'users': args.users,
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    })
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'request':<44} {'count':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for row in report['callbacks']:
+        print(f"{row['name'][:44]:<44} {row['requests']:>7} {row['errors']:>7} {row['p50_ms']:>8.1f} "
+              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+    print(f"\n{report['sessions']} sessions, {report['requests']} requests in "
+          f"{report['elapsed_seconds']:.1f}s: {report['requests_per_second']:.1f} req/s, "
+          f"error rate {report['error_rate']:.2%}")
+
+
+if __name__ == '__main__':
+    main()
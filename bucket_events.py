@@ -0,0 +1,331 @@
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import unquote_plus
+
+
+# A change is a (event_type, bucket, key, etag) tuple where event_type is
+# 'added' or 'removed'; etag is None for removals.
+
+
+# S3 event notifications delivered to an SQS queue, either directly or
+# wrapped in an SNS envelope. get_client returns the SQS client (see
+# aws_clients.ClientFactory).
+class SqsChangeFeed:
+    def __init__(self, get_client, queue_url):
+        self.get_client = get_client
+        self.queue_url = queue_url
+
+    # Passes the changes of the received messages to handle and only then
+    # deletes them, so a batch handle fails on is delivered again
+    def poll(self, timeout, handle):
+        client = self.get_client()
+        response = client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=10,
+            WaitTimeSeconds=int(min(max(timeout, 0), 20))
+        )
+        messages = response.get('Messages', [])
+        if not messages:
+            return
+        changes = []
+        for message in messages:
+            changes.extend(parse_s3_event(message.get('Body', '')))
+        handle(changes)
+        client.delete_message_batch(
+            QueueUrl=self.queue_url,
+            Entries=[
+                {'Id': str(i), 'ReceiptHandle': m['ReceiptHandle']}
+                for i, m in enumerate(messages)
+            ]
+        )
+
+
+# Stand-in for the SQS feed for local development and tests: a directory of
+# message files holding the same S3 event JSON. publish() may be called from
+# any process on the host, e.g. benchmarks/fake_s3.py --events-dir.
+class LocalChangeFeed:
+    def __init__(self, directory, interval=0.5):
+        self.directory = directory
+        self.interval = interval
+        os.makedirs(directory, exist_ok=True)
+
+    def publish(self, event_type, bucket, key, etag=None):
+        publish_local_event(self.directory, event_type, bucket, key, etag)
+
+    def poll(self, timeout, handle):
+        deadline = time.monotonic() + timeout
+        while True:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith('.json'))
+            if names or time.monotonic() >= deadline:
+                break
+            time.sleep(self.interval)
+        if not names:
+            return
+        changes = []
+        for name in names:
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    changes.extend(parse_s3_event(f.read()))
+            except FileNotFoundError:
+                continue
+        handle(changes)
+        for name in names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+
+# Writes one change as an S3 event notification file for LocalChangeFeed.
+# Files are named by time so they are read in order.
+def publish_local_event(directory, event_type, bucket, key, etag=None):
+    event_name = 'ObjectCreated:Put' if event_type == 'added' else 'ObjectRemoved:Delete'
+    obj = {'key': key}
+    if etag:
+        obj['eTag'] = etag
+    body = json.dumps({'Records': [{'eventName': event_name, 's3': {'bucket': {'name': bucket}, 'object': obj}}]})
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(tmp_path, os.path.join(directory, f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.json"))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def parse_s3_event(body):
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return []
+    if 'Message' in payload and 'Records' not in payload:
+        try:
+            payload = json.loads(payload['Message'])
+        except (TypeError, ValueError):
+            return []
+
+    changes = []
+    for record in payload.get('Records', []):
+        event_name = record.get('eventName', '')
+        s3 = record.get('s3', {})
+        bucket = s3.get('bucket', {}).get('name')
+        key = s3.get('object', {}).get('key')
+        if not bucket or key is None:
+            continue
+        key = unquote_plus(key)
+        if event_name.startswith('ObjectCreated'):
+            changes.append(('added', bucket, key, s3['object'].get('eTag') or None))
+        elif event_name.startswith('ObjectRemoved'):
+            changes.append(('removed', bucket, key, None))
+    return changes
+
+
+CHANGE_LOG_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_type TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    etag TEXT,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS consumer (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    owner TEXT,
+    lease_until REAL NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO consumer (id) VALUES (1);
+'''
+
+
+# Changes received from the feed, in a SQLite file shared by every worker
+# process on the host. A queue message is delivered to one receiver only, so
+# one process at a time (the holder of the consumer lease) reads the feed
+# and appends to the log, and every process follows the log.
+class ChangeLog:
+    def __init__(self, path, retention=3600):
+        self.path = path
+        self.retention = retention
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(CHANGE_LOG_SCHEMA)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _after_fork(self):
+        self._local = threading.local()
+
+    # Takes or renews the consumer lease for owner
+    def acquire_lease(self, owner, seconds):
+        now = time.time()
+        with self._connection() as db:
+            cursor = db.execute(
+                'UPDATE consumer SET owner = ?, lease_until = ? WHERE id = 1 AND (owner = ? OR lease_until < ?)',
+                (owner, now + seconds, owner, now)
+            )
+        return cursor.rowcount == 1
+
+    def append(self, changes):
+        now = time.time()
+        with self._connection() as db:
+            db.executemany(
+                'INSERT INTO changes (event_type, bucket, key, etag, created) VALUES (?, ?, ?, ?, ?)',
+                [(event_type, bucket, key, etag, now) for event_type, bucket, key, etag in changes]
+            )
+            db.execute('DELETE FROM changes WHERE created < ?', (now - self.retention,))
+
+    def last_id(self):
+        row = self._connection().execute('SELECT max(id) FROM changes').fetchone()
+        return row[0] or 0
+
+    # [(id, change)] after after_id, oldest first
+    def read(self, after_id, limit=500):
+        rows = self._connection().execute(
+            'SELECT id, event_type, bucket, key, etag FROM changes WHERE id > ? ORDER BY id LIMIT ?',
+            (after_id, limit)
+        )
+        return [(row[0], tuple(row[1:])) for row in rows]
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+# Keeps this process in step with the bucket and fans deltas out to its
+# server-sent-event subscribers. A background thread started once per
+# process (whether or not anyone subscribes) follows the change log, passes
+# each batch of changes to on_change, which updates this process's caches
+# and returns a JSON-serializable delta (or None when nothing visible
+# changed), and publishes the delta. While this process holds the consumer
+# lease the same thread also reads the feed into the log.
+#
+# Every open stream holds a server thread, so at most max_subscribers are
+# served at once and each stream ends after max_stream_seconds; browsers
+# reconnect on their own (see the retry field) and the slot is reused.
+class GalleryEventBroker:
+    def __init__(self, feed, log, on_change, poll_timeout=10, follow_interval=1,
+                 lease_seconds=60, subscriber_queue_size=100, max_subscribers=4,
+                 max_stream_seconds=300):
+        self.feed = feed
+        self.log = log
+        self.on_change = on_change
+        self.poll_timeout = poll_timeout
+        self.follow_interval = follow_interval
+        self.lease_seconds = max(lease_seconds, 2 * poll_timeout)
+        self.subscriber_queue_size = subscriber_queue_size
+        self.max_subscribers = max_subscribers
+        self.max_stream_seconds = max_stream_seconds
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._started_pid = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The thread does not exist in the child, and neither do the
+        # parent's subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._started_pid = None
+
+    def start(self):
+        if self._started_pid == os.getpid():
+            return
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            threading.Thread(
+                target=self._run,
+                args=(f"{os.getpid()}-{uuid.uuid4().hex[:8]}", self.log.last_id()),
+                name='gallery-events',
+                daemon=True
+            ).start()
+
+    def subscribe(self):
+        self.start()
+        subscriber = queue.Queue(maxsize=self.subscriber_queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers()
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, delta):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(delta)
+            except queue.Full:
+                # A slow client loses its oldest delta rather than stalling the feed
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                subscriber.put_nowait(delta)
+
+    def stream(self, subscriber, heartbeat=15, encoder=None):
+        deadline = time.monotonic() + self.max_stream_seconds
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    delta = subscriber.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"data: {json.dumps(delta, cls=encoder)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _run(self, owner, last_id):
+        while True:
+            try:
+                if self.log.acquire_lease(owner, self.lease_seconds):
+                    self.feed.poll(self.poll_timeout, self.log.append)
+                else:
+                    time.sleep(self.follow_interval)
+                last_id = self._follow(last_id)
+            except Exception as e:
+                print(f"Error reading bucket change feed: {e}")
+                time.sleep(self.poll_timeout)
+
+    def _follow(self, last_id):
+        while True:
+            rows = self.log.read(last_id)
+            if not rows:
+                return last_id
+            last_id = rows[-1][0]
+            try:
+                delta = self.on_change([change for _, change in rows])
+            except Exception as e:
+                print(f"Error applying bucket changes: {e}")
+                continue
+            if delta:
+                self.publish(delta)
@@ -0,0 +1,76 @@
+import gzip
+
+# brotli is optional; without it responses are gzip-compressed only
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/xml',
+    'image/svg+xml', 'font/ttf', 'font/otf', 'application/x-font-ttf',
+}
+MIN_SIZE = 512
+
+
+def is_compressible(mimetype):
+    return mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def choose_encoding(accept_encodings, available=None):
+    # Prefer brotli, then gzip, honouring q=0 exclusions
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        if available is not None and encoding not in available:
+            continue
+        if accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+# best=True is for content compressed once and served many times
+def compress(data, encoding, best=False):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+
+
+# Each encoding of a resource is a different representation and gets its
+# own ETag: "<tag>-gzip", "<tag>-br", or the plain tag for identity
+def encoded_etag(tag, encoding):
+    return f"{tag}-{encoding}" if encoding else tag
+
+
+# after_request helper for dynamic responses (HTML, callback JSON, bundles).
+# Streamed and passthrough responses (SSE, NDJSON, send_file) are left
+# alone, as are partial and already-encoded responses. Dash only answers
+# If-None-Match for the identity tag, so a request revalidating an encoded
+# copy is answered with a 304 here; Vary makes shared caches store one copy
+# per encoding.
+def compress_response(response, request, min_size=MIN_SIZE):
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return response
+    if 'Content-Encoding' in response.headers or not is_compressible(response.mimetype):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+    tag, weak = response.get_etag()
+    if tag:
+        tag = encoded_etag(tag, encoding)
+        response.set_etag(tag, weak)
+        if request.if_none_match.contains_weak(tag):
+            response.status_code = 304
+            response.set_data(b'')
+            response.headers.pop('Content-Length', None)
+            return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,180 @@
+import argparse
+import glob
+import os
+import re
+import sys
+import urllib.request
+
+
+# Self-hosted fonts, subsetted per script. Each language loads one small
+# stylesheet declaring only its own faces, so English users never download
+# CJK or Arabic glyphs. Font files live in static/fonts/ (not committed) and
+# are produced by the build step at the bottom of this module, which the
+# deploy workflow runs before restarting the app:
+#
+#   pip install fonttools brotli
+#   python fonts.py --download          # fetch the source fonts, then build
+#   python fonts.py --source ~/fonts    # build from local .ttf files
+#
+# The build exits non-zero unless every font file was produced. Without font
+# files the stylesheets are empty and the font stack in app.css falls back
+# to system fonts, so a development checkout still works offline.
+
+# language -> (family, subset)
+LANGUAGE_FONTS = {
+    'en': ('Inter', 'latin'),
+    'fr': ('Inter', 'latin'),
+    'pt-BR': ('Inter', 'latin'),
+    'it': ('Inter', 'latin'),
+    'tl': ('Inter', 'latin'),
+    'es': ('Inter', 'latin'),
+    'ru': ('Noto Sans', 'cyrillic'),
+    'el': ('Noto Sans', 'greek'),
+    'ja': ('Noto Sans JP', 'ja'),
+    'zh': ('Noto Sans SC', 'zh'),
+    'ar': ('Noto Sans Arabic', 'arabic'),
+}
+FONT_WEIGHTS = {300: 'Light', 400: 'Regular', 500: 'Medium'}
+
+# Script subsets by unicode range. CJK fonts are too large to ship whole, so
+# they are cut down to ASCII plus the characters of the UI catalog; other
+# text in those languages falls back to system fonts.
+LATIN_RANGE = 'U+0000-00FF,U+0131,U+0152-0153,U+02BB-02BC,U+02C6,U+02DA,U+02DC,U+2000-206F,U+20AC,U+2122,U+2212'
+SUBSET_RANGES = {
+    'latin': LATIN_RANGE,
+    'cyrillic': 'U+0000-00FF,U+0400-045F,U+0490-0491,U+04B0-04B1,U+2000-206F,U+2116',
+    'greek': 'U+0000-00FF,U+0370-03FF,U+1F00-1FFF,U+2000-206F',
+    'arabic': 'U+0000-00FF,U+0600-06FF,U+200C-200E,U+2010-2011,U+204F,U+FB50-FDFF,U+FE70-FEFF',
+}
+CATALOG_SUBSETS = ('ja', 'zh')
+
+
+def font_filename(family, subset, weight):
+    return f"fonts/{family.lower().replace(' ', '-')}-{subset}-{weight}.woff2"
+
+
+def _catalog_text(catalog, subset):
+    langs = [lang for lang, (_, lang_subset) in LANGUAGE_FONTS.items() if lang_subset == subset]
+    return ''.join(str(value) for lang in langs for value in catalog.get(lang, {}).values())
+
+
+# Builds one stylesheet per language from the font files present in
+# static_files and registers it there, so it gets a content-hashed URL and
+# the same caching as every other static file. Returns lang -> (stylesheet
+# URL, URL of the regular weight for preloading or None).
+def register_font_stylesheets(static_files):
+    urls = {}
+    missing = set()
+    for lang, (family, subset) in LANGUAGE_FONTS.items():
+        rules = []
+        preload = None
+        for weight in FONT_WEIGHTS:
+            name = font_filename(family, subset, weight)
+            if not static_files.has(name):
+                missing.add(name)
+                continue
+            url = static_files.url(name)
+            if weight == 400:
+                preload = url
+            unicode_range = SUBSET_RANGES.get(subset)
+            rules.append(
+                "@font-face {\n"
+                f"    font-family: '{family}';\n"
+                "    font-style: normal;\n"
+                f"    font-weight: {weight};\n"
+                "    font-display: swap;\n"
+                f"    src: url('{url}') format('woff2');\n"
+                + (f"    unicode-range: {unicode_range};\n" if unicode_range else '')
+                + "}\n"
+            )
+        name = f"fonts/{lang}.css"
+        static_files.add(name, ''.join(rules).encode('utf-8'))
+        urls[lang] = (static_files.url(name), preload)
+    if missing:
+        print(f"WARNING: {len(missing)} font files missing from static/fonts, using system fonts; run python fonts.py --download")
+    return urls
+
+
+# Static TrueType files of each family and weight, from the Google Fonts
+# CSS API; it answers clients that do not advertise woff2 support with
+# plain .ttf URLs
+SOURCE_CSS_URL = 'https://fonts.googleapis.com/css?family={families}'
+
+
+def download_sources(source_dir):
+    families = sorted({family for family, _ in LANGUAGE_FONTS.values()})
+    weights = ','.join(str(weight) for weight in FONT_WEIGHTS)
+    url = SOURCE_CSS_URL.format(families='|'.join(f"{family.replace(' ', '+')}:{weights}" for family in families))
+    with urllib.request.urlopen(urllib.request.Request(url, headers={'User-Agent': 'fonts.py'}), timeout=60) as response:
+        css = response.read().decode('utf-8')
+
+    os.makedirs(source_dir, exist_ok=True)
+    for face in re.findall(r'@font-face\s*{([^}]*)}', css):
+        family = re.search(r"font-family:\s*'([^']+)'", face).group(1)
+        weight = int(re.search(r'font-weight:\s*(\d+)', face).group(1))
+        source = re.search(r'url\(([^)]+)\)', face).group(1)
+        if weight not in FONT_WEIGHTS:
+            continue
+        target = os.path.join(source_dir, f"{family.replace(' ', '')}-{FONT_WEIGHTS[weight]}.ttf")
+        urllib.request.urlretrieve(source, target)
+        print(f"{source} -> {target}")
+
+
+# Builds every font file and returns the ones that could not be built
+def build(source_dir, output_dir, catalog):
+    # Build-time only dependency
+    from fontTools import subset as ftsubset
+    from fontTools.ttLib import TTFont
+
+    missing = []
+    done = set()
+    for family, subset in LANGUAGE_FONTS.values():
+        if (family, subset) in done:
+            continue
+        done.add((family, subset))
+        for weight, weight_name in FONT_WEIGHTS.items():
+            pattern = os.path.join(source_dir, '**', f"{family.replace(' ', '')}*-{weight_name}.ttf")
+            sources = sorted(glob.glob(pattern, recursive=True))
+            if not sources:
+                print(f"ERROR: no source font for {family} {weight_name} ({pattern})")
+                missing.append(font_filename(family, subset, weight))
+                continue
+
+            options = ftsubset.Options()
+            options.flavor = 'woff2'
+            options.layout_features = ['*']
+            subsetter = ftsubset.Subsetter(options)
+            if subset in CATALOG_SUBSETS:
+                text = _catalog_text(catalog, subset)
+                subsetter.populate(text=text, unicodes=range(0x20, 0x7f))
+            else:
+                subsetter.populate(unicodes=ftsubset.parse_unicodes(SUBSET_RANGES[subset]))
+
+            font = TTFont(sources[0])
+            subsetter.subset(font)
+            target = os.path.join(output_dir, font_filename(family, subset, weight))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            font.flavor = 'woff2'
+            font.save(target)
+            print(f"{sources[0]} -> {target} ({os.path.getsize(target)} bytes)")
+    return missing
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Subset source fonts into static/fonts')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--source', help='directory with the static .ttf files')
+    source.add_argument('--download', action='store_true', help='fetch the source fonts first (into --cache)')
+    parser.add_argument('--cache', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '.font-sources'),
+                        help='where --download keeps the source fonts')
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    args = parser.parse_args()
+
+    # The catalog is plain data; the app itself is not imported
+    from translations import LANGUAGES
+    if args.download:
+        download_sources(args.cache)
+    missing = build(args.source or args.cache, args.output, LANGUAGES)
+    if missing:
+        print(f"ERROR: {len(missing)} font files were not built: {', '.join(missing)}")
+        sys.exit(1)
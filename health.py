@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+
+# Cached, asynchronous S3 connectivity check. status() never blocks on S3:
+# when the cached result is missing or stale it starts a head_bucket in a
+# background thread and returns what it knows so far. Failures are cached
+# for a shorter time than successes so recovery is noticed quickly.
+class S3ReadinessCheck:
+    def __init__(self, get_client, bucket, ttl, failure_ttl):
+        self.get_client = get_client
+        self.bucket = bucket
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self._result = {'status': 'pending', 'detail': 'S3 check has not completed yet'}
+        self._checked_at = None
+        self._running = False
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def status(self):
+        with self._lock:
+            result = dict(self._result)
+            checked_at = self._checked_at
+            if not self._running and self._is_stale(result, checked_at):
+                self._running = True
+                threading.Thread(target=self._run, name='s3-readiness', daemon=True).start()
+        if checked_at is not None:
+            result['age'] = round(time.monotonic() - checked_at, 3)
+        return result
+
+    def _is_stale(self, result, checked_at):
+        if checked_at is None:
+            return True
+        ttl = self.ttl if result['status'] in ('ok', 'not_configured') else self.failure_ttl
+        return time.monotonic() - checked_at >= ttl
+
+    def _run(self):
+        try:
+            result = self.check()
+        except Exception as e:
+            result = {'status': 'error', 'detail': f"{type(e).__name__}: {e}"}
+        with self._lock:
+            self._result = result
+            self._checked_at = time.monotonic()
+            self._running = False
+
+    def _after_fork(self):
+        # A check running in the parent does not exist in the child
+        self._lock = threading.Lock()
+        self._running = False
+
+    def check(self):
+        if not self.bucket:
+            print("WARNING: S3_BUCKET_NAME not set in .env file")
+            return {'status': 'not_configured', 'detail': 'S3_BUCKET_NAME is not set'}
+
+        client = self.get_client()
+        if client is None:
+            return {'status': 'error', 'detail': 'S3 client could not be created'}
+        # Loaded with the client
+        from botocore.exceptions import ClientError
+
+        try:
+            client.head_bucket(Bucket=self.bucket)
+            print(f"DEBUG: Successfully connected to bucket '{self.bucket}'")
+            return {'status': 'ok', 'detail': f"Connected to bucket '{self.bucket}'"}
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', '')
+            if error_code == '404':
+                detail = f"Bucket '{self.bucket}' not found"
+            elif error_code == '403':
+                detail = f"Access denied to bucket '{self.bucket}'. Check IAM role permissions."
+            else:
+                detail = str(e)
+        except Exception as e:
+            detail = f"{type(e).__name__}: {e}"
+        print(f"ERROR: {detail}")
+        return {'status': 'error', 'detail': detail}
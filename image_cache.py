@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+# Local disk cache of S3 objects for the image proxy route. Each object is
+# stored as a data file plus a small JSON file with its ETag, content type
+# and Last-Modified, named after a hash of bucket and key so every worker
+# process on the host shares the directory.
+#
+# A cached copy is served without calling S3 for `ttl` seconds, then
+# revalidated with one HEAD: an unchanged ETag only renews it, anything else
+# downloads the object again. Reads touch the data file's mtime, so when the
+# directory grows past max_bytes the least recently used files go first.
+# Objects over max_object_bytes are not cached; get() returns None and the
+# caller streams them from S3.
+class ImageCache:
+    def __init__(self, directory, max_bytes, ttl=300, max_object_bytes=None, chunk_size=1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_object_bytes = max_object_bytes if max_object_bytes is not None else max_bytes // 8
+        self.chunk_size = chunk_size
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}  # data path -> [lock, users]
+        os.makedirs(directory, exist_ok=True)
+        self._entries, self._bytes = self._scan_totals()
+
+    def _paths(self, bucket, key):
+        digest = hashlib.sha256(f"{bucket}/{key}".encode('utf-8')).hexdigest()
+        path = os.path.join(self.directory, digest)
+        return path, path + '.json'
+
+    def _scan(self):
+        files = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(('.json', '.tmp')):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _scan_totals(self):
+        files = self._scan()
+        return len(files), sum(size for _, size, _ in files)
+
+    # One download or revalidation per object at a time; concurrent requests
+    # for the same image wait for it instead of fetching it again
+    def _key_lock(self, path):
+        with self._lock:
+            entry = self._key_locks.setdefault(path, [threading.Lock(), 0])
+            entry[1] += 1
+        return entry
+
+    def _release(self, path, entry):
+        with self._lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._key_locks.pop(path, None)
+
+    def _read_meta(self, meta_path):
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # Temp files are unique per process and thread (forked workers share
+    # thread idents) and are left out of _scan by their suffix
+    def _temp_file(self):
+        return tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+
+    def _write_meta(self, meta_path, meta):
+        fd, tmp_path = self._temp_file()
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, meta_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    # (data path, {'etag', 'content_type', 'last_modified', 'size'}) of a
+    # current local copy, or None when the object is too large to cache.
+    # ClientError from S3 (e.g. a missing key) is passed on.
+    def get(self, client, bucket, key):
+        path, meta_path = self._paths(bucket, key)
+        entry = self._key_lock(path)
+        try:
+            with entry[0]:
+                meta = self._read_meta(meta_path)
+                if meta is not None and os.path.exists(path):
+                    if time.time() - meta['checked'] < self.ttl:
+                        self._touch(path)
+                        with self._lock:
+                            self.hits += 1
+                        return path, meta
+                    head = client.head_object(Bucket=bucket, Key=key)
+                    if head.get('ETag') == meta['etag']:
+                        meta['checked'] = time.time()
+                        self._write_meta(meta_path, meta)
+                        self._touch(path)
+                        with self._lock:
+                            self.hits += 1
+                            self.revalidations += 1
+                        return path, meta
+                else:
+                    head = client.head_object(Bucket=bucket, Key=key)
+
+                with self._lock:
+                    self.misses += 1
+                if head['ContentLength'] > self.max_object_bytes:
+                    return None
+                meta = self._download(client, bucket, key, path, meta_path)
+        finally:
+            self._release(path, entry)
+        self._evict()
+        return path, meta
+
+    def _download(self, client, bucket, key, path, meta_path):
+        response = client.get_object(Bucket=bucket, Key=key)
+        fd, tmp_path = self._temp_file()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response['Body'].iter_chunks(self.chunk_size):
+                    f.write(chunk)
+                    size += len(chunk)
+            old_size = os.path.getsize(path) if os.path.exists(path) else None
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        last_modified = response.get('LastModified')
+        meta = {
+            'etag': response.get('ETag'),
+            'content_type': response.get('ContentType'),
+            'last_modified': last_modified.timestamp() if last_modified else None,
+            'size': size,
+            'checked': time.time(),
+        }
+        self._write_meta(meta_path, meta)
+        with self._lock:
+            if old_size is None:
+                self._entries += 1
+                self._bytes += size
+            else:
+                self._bytes += size - old_size
+        return meta
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            if self._bytes <= self.max_bytes:
+                return
+        # Other workers write to the same directory, so the listing on disk
+        # (not this process's running total) decides what goes
+        files = sorted(self._scan())
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in files:
+            if total <= self.max_bytes * 0.9:
+                break
+            for name in (path, path + '.json'):
+                try:
+                    os.remove(name)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            evicted += 1
+        with self._lock:
+            self.evictions += evicted
+            self._entries = len(files) - evicted
+            self._bytes = total
+
+    def invalidate(self, bucket, key):
+        path, meta_path = self._paths(bucket, key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        try:
+            os.remove(meta_path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._entries -= 1
+            self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries': self._entries,
+                'bytes': self._bytes,
+            }
+
+
+def is_not_found(error):
+    from botocore.exceptions import ClientError
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
@@ -0,0 +1,311 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+JOB_ID = re.compile(r'[0-9a-f]{32}')
+
+
+# A unit of background work. The job function receives the Job, may update
+# job.progress (0.0 - 1.0) while it runs and should check job.cancelled at
+# convenient points to stop early.
+class Job:
+    def __init__(self, store=None):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.pid = os.getpid()
+        self._progress = 0.0
+        self._cancelled = threading.Event()
+        self._store = store
+
+    @property
+    def done(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    @property
+    def progress(self):
+        return self._progress
+
+    @progress.setter
+    def progress(self, value):
+        self._progress = value
+        if self._store is not None:
+            self._store.save(self, throttle=True)
+
+    # A cancel from another worker process arrives as a marker in the store
+    @property
+    def cancelled(self):
+        if self._cancelled.is_set():
+            return True
+        return self._store is not None and self._store.cancel_requested(self.id)
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._store is not None:
+            self._store.request_cancel(self.id)
+
+    def record(self):
+        return {
+            'id': self.id, 'status': self.status, 'progress': self._progress,
+            'result': self.result, 'error': self.error, 'created': self.created,
+            'finished': self.finished, 'pid': self.pid
+        }
+
+    @classmethod
+    def from_record(cls, record, store=None):
+        job = cls(store)
+        job.id = record['id']
+        job.status = record['status']
+        job._progress = record['progress']
+        job.result = record['result']
+        job.error = record['error']
+        job.created = record['created']
+        job.finished = record['finished']
+        job.pid = record['pid']
+        return job
+
+
+# Job state shared by every worker process on the host: one JSON file per
+# job in `directory`, replaced atomically on each change, so a poll answered
+# by any worker sees the job. The process running a job holds the live Job;
+# the others get snapshots from load(), whose result is the decoded JSON of
+# the live one (dumps serializes it, e.g. with PlotlyJSONEncoder for
+# components). Progress is written at most every progress_interval seconds.
+#
+# Job ids come from clients, so the directory must be private to this user:
+# it is created with mode 0700 and refused if another user owns it.
+class JobStore:
+    def __init__(self, directory, progress_interval=0.25, dumps=json.dumps):
+        self.directory = directory
+        self.progress_interval = progress_interval
+        self.dumps = dumps
+        self._saved = {}  # job id -> time.monotonic() of the last write
+        self._lock = threading.Lock()
+        make_private_dir(directory)
+
+    def _path(self, job_id, suffix='.job'):
+        return os.path.join(self.directory, job_id + suffix)
+
+    def save(self, job, throttle=False):
+        now = time.monotonic()
+        with self._lock:
+            if throttle and now - self._saved.get(job.id, 0) < self.progress_interval:
+                return
+            self._saved[job.id] = now
+            if job.done:
+                self._saved.pop(job.id, None)
+        data = self.dumps(job.record())
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(job.id))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    # Snapshot of a job, or None if it is unknown or expired. A job whose
+    # process has exited without finishing it is reported as failed.
+    def load(self, job_id):
+        if not job_id or not JOB_ID.fullmatch(job_id):
+            return None
+        try:
+            with open(self._path(job_id), encoding='utf-8') as f:
+                job = Job.from_record(json.load(f), self)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if not job.done and not pid_alive(job.pid):
+            job.status = 'failed'
+            job.error = 'Worker process exited'
+        return job
+
+    def request_cancel(self, job_id):
+        try:
+            with open(self._path(job_id, '.cancel'), 'w'):
+                pass
+        except OSError as e:
+            print(f"ERROR: Failed to cancel job {job_id}: {e}")
+
+    def cancel_requested(self, job_id):
+        return os.path.exists(self._path(job_id, '.cancel'))
+
+    # Removes jobs not written to since cutoff (a time.time() value) and
+    # returns the finished ones. A job is only returned to the worker whose
+    # delete succeeded, so each expires once.
+    def expire(self, cutoff):
+        expired = []
+        with os.scandir(self.directory) as it:
+            entries = [entry for entry in it if entry.name.endswith('.job')]
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            job = self.load(entry.name[:-len('.job')])
+            if job is None or not job.done:
+                continue
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            try:
+                os.remove(self._path(job.id, '.cancel'))
+            except FileNotFoundError:
+                pass
+            expired.append(job)
+        return expired
+
+
+def make_private_dir(directory):
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if os.stat(directory).st_uid != os.getuid():
+        raise PermissionError(f"{directory} is owned by another user")
+    os.chmod(directory, 0o700)
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Job manager: runs jobs on a bounded thread pool and keeps finished jobs
+# for `retention` seconds so their results can be polled and downloaded.
+# With a JobStore, jobs are visible to every worker process; without one
+# only to this process. With max_pending set, submit() raises JobQueueFull
+# instead of queueing more than that many unfinished jobs in this process.
+class JobManager:
+    def __init__(self, max_workers, retention, on_expire=None, name='job', max_pending=None,
+                 store=None, prune_interval=5):
+        self.retention = retention
+        self.on_expire = on_expire
+        self.max_pending = max_pending
+        self.store = store
+        self.prune_interval = prune_interval
+        self._pending = 0
+        self._jobs = {}
+        self._shared = {}  # key -> job started by submit_shared
+        self._last_prune = 0
+        self._lock = threading.Lock()
+        self._shared_lock = threading.RLock()  # submit_shared -> submit -> _prune
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    def submit(self, func, *args):
+        self._prune()
+        job = Job(self.store)
+        with self._lock:
+            if self.max_pending is not None and self._pending >= self.max_pending:
+                raise JobQueueFull(f"More than {self.max_pending} jobs pending")
+            self._pending += 1
+            self._jobs[job.id] = job
+        self._save(job)
+        self._executor.submit(self._run, job, func, args)
+        return job
+
+    # Like submit(), but while a job submitted under the same key is still
+    # running in this process, that job is returned instead of a new one.
+    # Shared jobs should not be cancelled by any one of their callers.
+    def submit_shared(self, key, func, *args):
+        with self._shared_lock:
+            job = self._shared.get(key)
+            if job is not None and not job.done and not job.cancelled:
+                return job
+            job = self.submit(func, *args)
+            self._shared[key] = job
+            return job
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and not job.done:
+            job.cancel()
+        return job
+
+    # The live job when this process runs it, else a snapshot from the store
+    def get(self, job_id):
+        self._prune()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.load(job_id)
+        return job
+
+    def _save(self, job):
+        if self.store is None:
+            return
+        try:
+            self.store.save(job)
+        except OSError as e:
+            print(f"ERROR: Failed to save job {job.id}: {e}")
+
+    def _run(self, job, func, args):
+        try:
+            if job.cancelled:
+                job.status = 'cancelled'
+                return
+            job.status = 'running'
+            self._save(job)
+            job.result = func(job, *args)
+            if job.cancelled:
+                job.status = 'cancelled'
+            else:
+                job._progress = 1.0
+                job.status = 'done'
+        except Exception as e:
+            print(f"Error in background job {job.id}: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+            self._save(job)
+            with self._lock:
+                self._pending -= 1
+
+    # Runs on submit and get, at most every prune_interval seconds
+    def _prune(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < self.prune_interval:
+                return
+            self._last_prune = now
+        cutoff = now - self.retention
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.finished is not None and job.finished < cutoff
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        with self._shared_lock:
+            for key in [key for key, job in self._shared.items() if job.done]:
+                del self._shared[key]
+        if self.store is not None:
+            # Any worker may expire a job; the store decides which one does
+            try:
+                expired = self.store.expire(cutoff)
+            except OSError as e:
+                print(f"ERROR: Failed to expire jobs: {e}")
+                expired = []
+        if self.on_expire is not None:
+            for job in expired:
+                try:
+                    self.on_expire(job)
+                except Exception as e:
+                    print(f"Error expiring job {job.id}: {e}")
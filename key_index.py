@@ -0,0 +1,105 @@
+import threading
+from bisect import bisect_left
+
+
+# Highest code point; prefix + this sorts after every key with that prefix
+PREFIX_END = '\U0010ffff'
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# In-memory index over a bucket listing. Keys are kept sorted (S3 already
+# lists them in this order), so prefix and folder lookups are a binary
+# search. Substring search uses a trigram index mapping every three-character
+# sequence to the ids of the keys containing it; a query only verifies the
+# keys in the intersection of its trigrams' postings instead of scanning
+# the whole bucket; terms too short for trigrams scan the keys under the
+# prefix until limit matches are found, so both match anywhere in the key
+# like the metadata index does. The trigram index is built on first search,
+# since most listings are only ever browsed. versions maps keys to their
+# ETags.
+class KeyIndex:
+    def __init__(self, keys, versions=None):
+        self.keys = keys if all(a <= b for a, b in zip(keys, keys[1:])) else sorted(keys)
+        self.versions = versions if versions is not None else {}
+        self._lowered = None
+        self._trigrams = None  # trigram -> [key ids, ascending]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def with_prefix(self, prefix):
+        if not prefix:
+            return self.keys
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + PREFIX_END, lo)
+        return self.keys[lo:hi]
+
+    # Immediate sub-"folders" of prefix, e.g. 'photos/' -> ['photos/2023/', ...].
+    # Each folder found skips all of its keys with one more binary search.
+    def folders(self, prefix='', delimiter='/'):
+        folders = []
+        keys = self.keys
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            cut = keys[i].find(delimiter, len(prefix))
+            if cut == -1:
+                i += 1
+                continue
+            folder = keys[i][:cut + len(delimiter)]
+            folders.append(folder)
+            i = bisect_left(keys, folder + PREFIX_END, i)
+        return folders
+
+    def search(self, term, prefix='', limit=None):
+        term = term.strip().lower()
+        if not term:
+            return []
+        if len(term) < 3:
+            lowered = self._lower()
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_left(self.keys, prefix + PREFIX_END, lo)
+            ids = (key_id for key_id in range(lo, hi) if term in lowered[key_id])
+        else:
+            self._build()
+            postings = sorted((self._trigrams.get(gram, ()) for gram in trigrams(term)), key=len)
+            if not postings[0]:
+                return []
+            candidates = set(postings[0]).intersection(*postings[1:]) if len(postings) > 1 else postings[0]
+            ids = sorted(key_id for key_id in candidates if term in self._lowered[key_id])
+
+        results = []
+        for key_id in ids:
+            key = self.keys[key_id]
+            if key.startswith(prefix):
+                results.append(key)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def _lower(self):
+        if self._lowered is None:
+            with self._lock:
+                if self._lowered is None:
+                    self._lowered = [key.lower() for key in self.keys]
+        return self._lowered
+
+    def _build(self):
+        if self._trigrams is not None:
+            return
+        lowered = self._lower()
+        with self._lock:
+            if self._trigrams is not None:
+                return
+            index = {}
+            for key_id, key in enumerate(lowered):
+                for gram in trigrams(key):
+                    postings = index.get(gram)
+                    if postings is None:
+                        index[gram] = [key_id]
+                    else:
+                        postings.append(key_id)
+            self._trigrams = index
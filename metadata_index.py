@@ -0,0 +1,371 @@
+import os
+import sqlite3
+import threading
+import time
+from io import BytesIO
+
+from key_index import PREFIX_END
+# Pillow is optional (imported on first probe); without it image dimensions
+# are left empty
+from thumbnails import HAS_PILLOW
+
+
+PROBE_BYTES = 65536
+# An object S3 fails to return is retried after PROBE_RETRY_SECONDS, doubling
+# with each failure up to PROBE_RETRY_MAX_SECONDS
+PROBE_RETRY_SECONDS = 60
+PROBE_RETRY_MAX_SECONDS = 86400
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS objects (
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    size INTEGER,
+    etag TEXT,
+    last_modified REAL,
+    content_type TEXT,
+    width INTEGER,
+    height INTEGER,
+    probed INTEGER NOT NULL DEFAULT 0,
+    probe_failures INTEGER NOT NULL DEFAULT 0,
+    probe_after REAL NOT NULL DEFAULT 0,
+    generation INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS objects_by_name ON objects (bucket, parent, key);
+CREATE INDEX IF NOT EXISTS objects_by_modified ON objects (bucket, parent, last_modified);
+CREATE INDEX IF NOT EXISTS objects_by_size ON objects (bucket, parent, size);
+DROP INDEX IF EXISTS objects_unprobed;
+CREATE INDEX IF NOT EXISTS objects_to_probe ON objects (bucket, probed, probe_after);
+CREATE TABLE IF NOT EXISTS sync_state (
+    bucket TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL,
+    lease_until REAL NOT NULL DEFAULT 0
+);
+'''
+
+# An object whose ETag and LastModified are unchanged keeps its probed
+# content type and dimensions; anything else is queued for probing again
+UPSERT = '''
+INSERT INTO objects (bucket, key, parent, size, etag, last_modified, generation)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (bucket, key) DO UPDATE SET
+    generation = excluded.generation,
+    probed = CASE WHEN objects.etag IS excluded.etag
+                   AND objects.last_modified IS excluded.last_modified
+                  THEN objects.probed ELSE 0 END,
+    probe_failures = CASE WHEN objects.etag IS excluded.etag
+                           AND objects.last_modified IS excluded.last_modified
+                          THEN objects.probe_failures ELSE 0 END,
+    probe_after = CASE WHEN objects.etag IS excluded.etag
+                        AND objects.last_modified IS excluded.last_modified
+                       THEN objects.probe_after ELSE 0 END,
+    size = excluded.size,
+    etag = excluded.etag,
+    last_modified = excluded.last_modified
+'''
+
+# Immediate subfolders of :prefix, one objects_by_name seek per subfolder
+FOLDERS = '''
+WITH RECURSIVE subfolders (folder) AS (
+    SELECT (SELECT substr(parent, 1, :length + instr(substr(parent, :length + 1), :delimiter) + :extra)
+            FROM objects WHERE bucket = :bucket AND parent > :prefix AND parent < :end
+            ORDER BY parent LIMIT 1)
+    UNION ALL
+    SELECT (SELECT substr(parent, 1, :length + instr(substr(parent, :length + 1), :delimiter) + :extra)
+            FROM objects WHERE bucket = :bucket AND parent > folder || :max AND parent < :end
+            ORDER BY parent LIMIT 1)
+    FROM subfolders WHERE folder IS NOT NULL
+)
+SELECT folder FROM subfolders WHERE folder IS NOT NULL
+'''
+
+SORT_ORDERS = {
+    'name': 'key',
+    'newest': 'last_modified DESC, key',
+    'largest': 'size DESC, key',
+}
+
+
+# Local SQLite copy of the bucket's image metadata: key, size, ETag,
+# LastModified, content type and pixel dimensions. Folder listings, sorting
+# and search are SQL queries against the file, so new workers and restarts
+# start warm instead of re-listing the bucket.
+#
+# S3 has no "changed since" listing, so a sync still pages through
+# ListObjectsV2, but it only rewrites rows and re-probes objects whose ETag
+# or LastModified changed; rows not seen in the pass are deleted. Syncs run
+# in one background thread per process, and a lease row in the database
+# lets only one process sync a bucket at a time.
+class MetadataIndex:
+    def __init__(self, path, delimiter='/', include=None, probe=True):
+        self.path = path
+        self.delimiter = delimiter
+        self.include = include
+        self.probe_enabled = probe and HAS_PILLOW
+        self._local = threading.local()
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._migrate()
+        self._connection().executescript(SCHEMA)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    # Columns added since the first release of the index file
+    def _migrate(self):
+        db = self._connection()
+        columns = {row[1] for row in db.execute('PRAGMA table_info(objects)')}
+        if columns and 'probe_failures' not in columns:
+            with db:
+                db.execute('ALTER TABLE objects ADD COLUMN probe_failures INTEGER NOT NULL DEFAULT 0')
+                db.execute('ALTER TABLE objects ADD COLUMN probe_after REAL NOT NULL DEFAULT 0')
+
+    def _after_fork(self):
+        # SQLite connections must not cross a fork, and the sync thread
+        # does not exist in the child
+        self._local = threading.local()
+        self._start_lock = threading.Lock()
+        self._started_pid = None
+
+    def parent(self, key):
+        if not self.delimiter:
+            return ''
+        cut = key.rfind(self.delimiter)
+        return key[:cut + len(self.delimiter)] if cut != -1 else ''
+
+    # Sync state
+
+    def synced_at(self, bucket):
+        row = self._connection().execute(
+            'SELECT synced_at FROM sync_state WHERE bucket = ?', (bucket,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _acquire_lease(self, bucket, seconds):
+        now = time.time()
+        with self._connection() as db:
+            db.execute('INSERT OR IGNORE INTO sync_state (bucket) VALUES (?)', (bucket,))
+            cursor = db.execute(
+                'UPDATE sync_state SET lease_until = ? WHERE bucket = ? AND lease_until < ?',
+                (now + seconds, bucket, now)
+            )
+        return cursor.rowcount == 1
+
+    def _release_lease(self, bucket):
+        with self._connection() as db:
+            db.execute('UPDATE sync_state SET lease_until = 0 WHERE bucket = ?', (bucket,))
+
+    # The generation a sync started now writes: rows it lists, and rows the
+    # change feed touches meanwhile (see upsert), carry it and are kept
+    def _next_generation(self, bucket):
+        row = self._connection().execute(
+            'SELECT generation FROM sync_state WHERE bucket = ?', (bucket,)
+        ).fetchone()
+        return (row[0] if row else 0) + 1
+
+    # Lists the bucket, or only the keys under prefix (a gallery refresh),
+    # and drops rows in that range the listing no longer has
+    def sync(self, client, bucket, prefix=''):
+        db = self._connection()
+        generation = self._next_generation(bucket)
+        listed = 0
+        paginator = client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            rows = [
+                (bucket, obj['Key'], self.parent(obj['Key']), obj.get('Size'),
+                 obj.get('ETag'), obj['LastModified'].timestamp() if obj.get('LastModified') else None,
+                 generation)
+                for obj in page.get('Contents', [])
+                if self.include is None or self.include(obj['Key'])
+            ]
+            with db:
+                db.executemany(UPSERT, rows)
+            listed += len(rows)
+        with db:
+            removed = db.execute(
+                'DELETE FROM objects WHERE bucket = ? AND generation < ? AND key >= ? AND key < ?',
+                (bucket, generation, prefix, prefix + PREFIX_END)
+            ).rowcount
+            if not prefix:
+                db.execute(
+                    'UPDATE sync_state SET generation = ?, synced_at = ?, lease_until = 0 WHERE bucket = ?',
+                    (generation, time.time(), bucket)
+                )
+        return {'listed': listed, 'removed': removed}
+
+    # Re-lists prefix now (a gallery refresh) under the same lease as the
+    # background sync, so concurrent refreshes and syncs of the bucket do not
+    # list it twice. Returns the sync stats, or None when another sync holds
+    # the lease and will pick up the changes.
+    def refresh(self, client, bucket, prefix, lease=600):
+        if not self._acquire_lease(bucket, lease):
+            return None
+        try:
+            return self.sync(client, bucket, prefix)
+        finally:
+            self._release_lease(bucket)
+
+    # Reads the first bytes of up to limit objects that are new or changed
+    # since they were last probed, for their content type and pixel
+    # dimensions. Objects S3 fails to return are retried later with backoff,
+    # so they do not hold up the rest. Returns how many objects were tried.
+    def probe(self, client, bucket, limit=100):
+        from PIL import Image
+        from botocore.exceptions import BotoCoreError, ClientError
+        db = self._connection()
+        now = time.time()
+        rows = db.execute(
+            'SELECT key, probe_failures FROM objects WHERE bucket = ? AND probed = 0 AND probe_after <= ? '
+            'ORDER BY probe_after LIMIT ?',
+            (bucket, now, limit)
+        ).fetchall()
+        results = []
+        failures = []
+        for key, failed in rows:
+            content_type = width = height = None
+            try:
+                response = client.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{PROBE_BYTES - 1}")
+                header = response['Body'].read()
+                content_type = response.get('ContentType')
+            except ClientError as e:
+                # A deleted object is dropped by the next sync and an empty
+                # one has no header; throttling and server errors are
+                # retried on the next pass
+                if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'InvalidRange'):
+                    failures.append((failed + 1, now + probe_backoff(failed + 1), bucket, key))
+                    continue
+                header = None
+            except BotoCoreError:
+                failures.append((failed + 1, now + probe_backoff(failed + 1), bucket, key))
+                continue
+            if header is not None:
+                try:
+                    with Image.open(BytesIO(header)) as image:
+                        width, height = image.size
+                except Exception:
+                    # Unreadable headers (e.g. SVG) are not retried until the object changes
+                    pass
+            results.append((content_type, width, height, bucket, key))
+        with db:
+            db.executemany(
+                'UPDATE objects SET content_type = ?, width = ?, height = ?, probed = 1 '
+                'WHERE bucket = ? AND key = ?',
+                results
+            )
+            db.executemany(
+                'UPDATE objects SET probe_failures = ?, probe_after = ? WHERE bucket = ? AND key = ?',
+                failures
+            )
+        return len(rows)
+
+    # Change feed updates, applied between syncs
+
+    # Stamped with the generation of the next (or running) sync, so a sync
+    # in progress does not delete a row added after its listing passed it.
+    # etag comes unquoted from the event and is stored as listings return it.
+    def upsert(self, bucket, key, etag=None):
+        db = self._connection()
+        generation = self._next_generation(bucket)
+        etag = f'"{etag}"' if etag else None
+        with db:
+            db.execute(UPSERT, (bucket, key, self.parent(key), None, etag, None, generation))
+
+    def delete(self, bucket, key):
+        with self._connection() as db:
+            db.execute('DELETE FROM objects WHERE bucket = ? AND key = ?', (bucket, key))
+
+    def start(self, get_client, bucket, interval, lease=600):
+        if self._started_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            threading.Thread(
+                target=self._sync_loop,
+                args=(get_client, bucket, interval, lease),
+                name='metadata-sync',
+                daemon=True
+            ).start()
+
+    def _sync_loop(self, get_client, bucket, interval, lease):
+        while True:
+            try:
+                client = get_client()
+                synced_at = self.synced_at(bucket)
+                stale = synced_at is None or time.time() - synced_at >= interval
+                if client is not None and stale and self._acquire_lease(bucket, lease):
+                    started = time.monotonic()
+                    stats = self.sync(client, bucket)
+                    print(f"DEBUG: Metadata index synced {stats['listed']} objects "
+                          f"({stats['removed']} removed) in {time.monotonic() - started:.1f}s")
+                probed = 0
+                if client is not None and self.probe_enabled:
+                    # One batch per pass, so a large backlog of probes does
+                    # not hold up the next sync
+                    probed = self.probe(client, bucket)
+            except Exception as e:
+                print(f"ERROR: Metadata index sync failed: {e}")
+                probed = 0
+            time.sleep(1 if probed else min(interval, 30))
+
+    # Queries
+
+    def _where(self, bucket, prefix, query):
+        if query or not self.delimiter:
+            clauses = ['bucket = ?', 'key >= ?', 'key < ?']
+            params = [bucket, prefix, prefix + PREFIX_END]
+        else:
+            clauses = ['bucket = ?', 'parent = ?']
+            params = [bucket, prefix]
+        if query:
+            clauses.append('instr(lower(key), ?) > 0')
+            params.append(query.lower())
+        return ' AND '.join(clauses), params
+
+    def folders(self, bucket, prefix):
+        if not self.delimiter:
+            return []
+        # Immediate subfolders are the first path segment below prefix of
+        # the deeper parents. Like KeyIndex.folders, each one found skips
+        # past all of its rows with one index seek, so the cost is the number
+        # of subfolders rather than of objects below prefix.
+        rows = self._connection().execute(FOLDERS, {
+            'bucket': bucket, 'prefix': prefix, 'end': prefix + PREFIX_END, 'max': PREFIX_END,
+            'length': len(prefix), 'delimiter': self.delimiter, 'extra': len(self.delimiter) - 1,
+        })
+        return [row[0] for row in rows]
+
+    def count(self, bucket, prefix, query=None):
+        where, params = self._where(bucket, prefix, query)
+        return self._connection().execute(f"SELECT count(*) FROM objects WHERE {where}", params).fetchone()[0]
+
+    def page(self, bucket, prefix, query=None, sort='name', offset=0, limit=None):
+        where, params = self._where(bucket, prefix, query)
+        order = SORT_ORDERS.get(sort, SORT_ORDERS['name'])
+        rows = self._connection().execute(
+            f"SELECT key, etag, width, height FROM objects WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset]
+        )
+        return [
+            {'key': key, 'etag': (etag or '').strip('"') or None, 'width': width, 'height': height}
+            for key, etag, width, height in rows
+        ]
+
+
+def probe_backoff(failures):
+    return min(PROBE_RETRY_SECONDS * 2 ** (failures - 1), PROBE_RETRY_MAX_SECONDS)
@@ -0,0 +1,223 @@
+import cProfile
+import functools
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+
+MODES = ('sampling', 'deterministic')
+
+
+# On-demand profiling for callbacks and background jobs. A run is started
+# for a request or job and ends with it; only runs that were actually
+# profiled write a file:
+#
+#   - sampling: a shared thread records the run's stack every `interval`
+#     seconds, written as collapsed stacks ("a;b;c 12" per line) for
+#     flamegraph.pl, speedscope or inferno
+#   - deterministic: cProfile on the run's own thread, written as a pstats
+#     .prof file for snakeviz or flameprof
+#
+# With slow_seconds set, unprofiled runs are watched and switch to sampling
+# once they take longer than that, so a slow call shows where its remaining
+# time goes. When profiling is off, begin() returns before touching any
+# shared state. Only the newest `retention` files are kept.
+class Profiler:
+    def __init__(self, directory, mode='off', slow_seconds=0, interval=0.005, retention=50, token=None):
+        self.directory = directory
+        self.mode = mode if mode in MODES else None
+        self.slow_seconds = slow_seconds
+        self.interval = interval
+        self.retention = retention
+        self.token = token
+        self._runs = {}  # thread id -> _Run
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started_pid = None
+        self._sequence = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The sampler thread does not exist in the child
+        self._runs = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started_pid = None
+
+    # Mode asked for by a request's X-Profile header, if it carries the token
+    def requested_mode(self, headers):
+        mode = headers.get('X-Profile')
+        if not mode or not self.token or mode not in MODES:
+            return None
+        if not hmac.compare_digest(headers.get('X-Profile-Token', ''), self.token):
+            return None
+        return mode
+
+    def begin(self, name, mode=None):
+        trigger = 'requested' if mode else 'configured'
+        mode = mode or self.mode
+        if mode is None and not self.slow_seconds:
+            return None
+        run = _Run(name, mode, trigger if mode else 'slow')
+        if mode == 'deterministic':
+            run.profile = cProfile.Profile()
+            try:
+                run.profile.enable()
+            except ValueError:
+                # Another profiler is active (one cProfile at a time on
+                # Python 3.12+); sample this run instead
+                run.profile = None
+                run.mode = 'sampling'
+        if run.mode == 'deterministic':
+            return run
+        self._ensure_sampler()
+        with self._lock:
+            # Nested runs (a profiled job called inline) belong to the outer one
+            if run.thread_id in self._runs:
+                return None
+            self._runs[run.thread_id] = run
+        self._wakeup.set()
+        return run
+
+    # Stops the run and returns the name of the profile file, or None
+    def end(self, run):
+        if run is None:
+            return None
+        if run.profile is not None:
+            run.profile.disable()
+        else:
+            with self._lock:
+                self._runs.pop(run.thread_id, None)
+        if run.mode is None or (run.profile is None and not run.stacks):
+            return None
+        try:
+            return self._write(run, time.monotonic() - run.started)
+        except OSError as e:
+            print(f"ERROR: Failed to write profile for {run.name}: {e}")
+            return None
+
+    def profiled(self, name):
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                run = self.begin(name)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.end(run)
+            return wrapper
+        return decorate
+
+    def _ensure_sampler(self):
+        if self._started_pid == os.getpid():
+            return
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            threading.Thread(target=self._sample_loop, name='profiler', daemon=True).start()
+
+    def _sample_loop(self):
+        watch_interval = min(self.slow_seconds / 4, 0.05) if self.slow_seconds else self.interval
+        while True:
+            with self._lock:
+                if not self._runs:
+                    self._wakeup.clear()
+                    idle = True
+                else:
+                    idle = False
+                    now = time.monotonic()
+                    sampling = False
+                    frames = None
+                    for thread_id, run in self._runs.items():
+                        if run.mode is None and now - run.started >= self.slow_seconds:
+                            run.mode = 'sampling'
+                        if run.mode == 'sampling':
+                            sampling = True
+                            if frames is None:
+                                frames = sys._current_frames()
+                            frame = frames.get(thread_id)
+                            if frame is not None:
+                                run.stacks[collapse(frame)] += 1
+                    del frames
+            if idle:
+                self._wakeup.wait()
+            else:
+                time.sleep(self.interval if sampling else watch_interval)
+
+    def _write(self, run, elapsed):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        stem = '-'.join([
+            time.strftime('%Y%m%d-%H%M%S'),
+            str(os.getpid()),
+            str(sequence),
+            re.sub(r'[^A-Za-z0-9_.]+', '_', run.name)[:60] or 'request',
+            run.trigger,
+            f"{elapsed * 1000:.0f}ms"
+        ])
+        if run.profile is not None:
+            name = stem + '.prof'
+            run.profile.dump_stats(os.path.join(self.directory, name))
+        else:
+            name = stem + '.collapsed'
+            with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+                for stack, count in run.stacks.items():
+                    f.write(f"{stack} {count}\n")
+        self._prune()
+        return name
+
+    def _prune(self):
+        files = self.files()
+        for name in files[self.retention:]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    # Profile files, newest first
+    def files(self):
+        files = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(('.collapsed', '.prof')):
+                        continue
+                    try:
+                        files.append((entry.stat().st_mtime, entry.name))
+                    except FileNotFoundError:
+                        # Pruned by another worker
+                        continue
+        except FileNotFoundError:
+            return []
+        return [name for _, name in sorted(files, reverse=True)]
+
+
+class _Run:
+    def __init__(self, name, mode, trigger):
+        self.name = name
+        self.mode = mode
+        self.trigger = trigger
+        self.thread_id = threading.get_ident()
+        self.started = time.monotonic()
+        self.stacks = Counter()
+        self.profile = None
+
+
+# One collapsed stack, outermost frame first. Frames are identified by
+# function and definition line, so samples at different lines of the same
+# call merge into one flamegraph box.
+def collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# TTL cache with a bounded number of entries and single-flight loading.
+# When several threads ask for the same missing key at once, only the first
+# one runs the loader; the others wait for its result instead of issuing
+# their own S3 request.
+class TTLCache:
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> _Flight
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._get_fresh(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._get_fresh(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = _Flight()
+                self._inflight[key] = flight
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.fail(e)
+            raise
+
+        with self._lock:
+            self._store(key, value)
+            self._inflight.pop(key, None)
+        flight.resolve(value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_ratio': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+            }
+
+    def _get_fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class _Flight:
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+
+    def resolve(self, value):
+        self._value = value
+        self._done.set()
+
+    def fail(self, error):
+        self._error = error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+# Presigned URL cache keyed by (bucket, key). A URL is reused until it gets
+# within refresh_margin seconds of expiry; entries are evicted least recently
+# used first once their approximate size exceeds max_bytes. on_sign, if set,
+# is called with the duration of every signing call.
+#
+# A URL signed with temporary credentials (instance or task role) stops
+# working when their session token expires, which may be before ExpiresIn,
+# so such URLs are only reused until the token gets within refresh_margin
+# seconds of its expiry.
+class PresignedUrlCache:
+    def __init__(self, expires_in, refresh_margin, max_bytes, on_sign=None):
+        self.expires_in = expires_in
+        self.on_sign = on_sign
+        self.refresh_margin = min(refresh_margin, expires_in / 2)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (bucket, key) -> (reuse_until, url, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_url(self, client, bucket, key):
+        cache_key = (bucket, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        started = time.perf_counter()
+        url = client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': bucket, 'Key': key},
+            ExpiresIn=self.expires_in
+        )
+        if self.on_sign is not None:
+            self.on_sign(time.perf_counter() - started)
+        lifetime = self.expires_in
+        remaining = credentials_remaining(client)
+        if remaining is not None:
+            lifetime = min(lifetime, remaining)
+        reuse_until = now + lifetime - self.refresh_margin
+        size = len(url) + len(bucket) + len(key)
+
+        with self._lock:
+            old = self._entries.pop(cache_key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[cache_key] = (reuse_until, url, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+        return url
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+
+# Seconds until the temporary credentials a client signs with expire, or None
+# for long-term credentials. botocore has no public accessor for them.
+def credentials_remaining(client):
+    get_credentials = getattr(client, '_get_credentials', None)
+    credentials = get_credentials() if get_credentials is not None else None
+    if getattr(credentials, '_expiry_time', None) is None:
+        return None
+    try:
+        return credentials._seconds_remaining()
+    except Exception:
+        return None
@@ -0,0 +1,87 @@
+import hashlib
+import mimetypes
+import os
+
+from flask import Response
+
+from compression import MIN_SIZE, choose_encoding, compress, encoded_etag, is_compressible
+
+mimetypes.add_type('font/woff2', '.woff2')
+
+
+# Serves a directory of static files under content-hashed names
+# (css/app.css -> css/app.3f2a9c1d4e5b.css). A new deploy that changes a
+# file changes its URL, so responses are cached for a year as immutable.
+# Files are read and pre-compressed once at startup, which keeps a request
+# down to a dict lookup.
+class HashedStaticFiles:
+    def __init__(self, directory, url_prefix, max_age=31536000):
+        self.directory = directory
+        self.url_prefix = url_prefix.rstrip('/')
+        self.max_age = max_age
+        self._names = {}  # name -> hashed name
+        self._files = {}  # hashed name -> (etag, mimetype, {encoding: body})
+        self.reload()
+
+    def reload(self):
+        self._names = {}
+        self._files = {}
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self.add(os.path.relpath(path, self.directory).replace(os.sep, '/'), data)
+
+    # Registers generated content (e.g. per-language font stylesheets)
+    # alongside the files on disk
+    def add(self, name, data):
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{digest}{ext}"
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        bodies = {None: data}
+        if is_compressible(mimetype) and len(data) >= MIN_SIZE:
+            for encoding in ('gzip', 'br'):
+                if choose_encoding(_AcceptOnly(encoding)) == encoding:
+                    bodies[encoding] = compress(data, encoding, best=True)
+        self._names[name] = hashed
+        self._files[hashed] = (digest, mimetype, bodies)
+
+    def has(self, name):
+        return name in self._names
+
+    def url(self, name):
+        return f"{self.url_prefix}/{self._names[name]}"
+
+    def response(self, hashed_name, request):
+        entry = self._files.get(hashed_name)
+        if entry is None:
+            return None
+        etag, mimetype, bodies = entry
+
+        encoding = choose_encoding(request.accept_encodings, bodies) if len(bodies) > 1 else None
+        etag = encoded_etag(etag, encoding)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(bodies[encoding], mimetype=mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        response.cache_control.immutable = True
+        if len(bodies) > 1:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+# Minimal stand-in for werkzeug's Accept header object, used to ask
+# choose_encoding whether an encoding is available at all
+class _AcceptOnly:
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+    def quality(self, encoding):
+        return 1 if encoding == self.encoding else 0
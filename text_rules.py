@@ -0,0 +1,117 @@
+import json
+import re
+
+
+# Built-in substitutions applied by process_text
+DEFAULT_RULES = (('a', '@'), ('i', '!'), ('e', '&'))
+
+
+# A rule set compiled once into a single-pass transformer. Single-character
+# rules become a str.translate table; otherwise the patterns are merged into
+# a trie-shaped regular expression that matches the longest rule at each
+# position, so every character of the input is scanned exactly once.
+class RuleSet:
+    def __init__(self, rules):
+        if isinstance(rules, dict):
+            rules = rules.items()
+        self.rules = {}
+        for pattern, replacement in rules:
+            if not isinstance(pattern, str) or not pattern:
+                raise ValueError(f"Rule patterns must be non-empty strings, got {pattern!r}")
+            if not isinstance(replacement, str):
+                raise ValueError(f"Replacement for {pattern!r} must be a string")
+            self.rules[pattern] = replacement
+
+        self._table = None
+        self._regex = None
+        self._max_len = max((len(pattern) for pattern in self.rules), default=0)
+        if all(len(pattern) == 1 for pattern in self.rules):
+            self._table = str.maketrans(self.rules)
+        elif self.rules:
+            self._regex = re.compile(_trie_pattern(_build_trie(self.rules)))
+
+    def apply(self, text):
+        if self._table is not None:
+            return text.translate(self._table)
+        if self._regex is not None:
+            return self._regex.sub(self._replace, text)
+        return text
+
+    def stream(self, chunks):
+        # Transforms an iterable of text chunks lazily. A rule can only span
+        # a chunk boundary if it is longer than one character, so at most
+        # (longest pattern - 1) characters are carried into the next chunk.
+        if self._regex is None:
+            for chunk in chunks:
+                yield self.apply(chunk)
+            return
+
+        keep = self._max_len - 1
+        buffer = ''
+        for chunk in chunks:
+            buffer += chunk
+            cutoff = len(buffer) - keep
+            if cutoff <= 0:
+                continue
+            parts = []
+            pos = 0
+            for match in self._regex.finditer(buffer):
+                if match.start() >= cutoff:
+                    break
+                parts.append(buffer[pos:match.start()])
+                parts.append(self.rules[match.group()])
+                pos = match.end()
+            if pos < cutoff:
+                parts.append(buffer[pos:cutoff])
+                pos = cutoff
+            buffer = buffer[pos:]
+            yield ''.join(parts)
+        if buffer:
+            yield self.apply(buffer)
+
+    def _replace(self, match):
+        return self.rules[match.group()]
+
+    def __len__(self):
+        return len(self.rules)
+
+
+def load_rules(path):
+    # Rule files are JSON: either an object of pattern -> replacement or a
+    # list of [pattern, replacement] pairs
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return list(data.items())
+    return [tuple(pair) for pair in data]
+
+
+def _build_trie(patterns):
+    root = {}
+    for pattern in patterns:
+        node = root
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[''] = True
+    return root
+
+
+def _trie_pattern(node):
+    branches = []
+    singles = []
+    terminal = '' in node
+    for char in sorted(key for key in node if key != ''):
+        child = node[char]
+        if len(child) == 1 and '' in child:
+            singles.append(re.escape(char))
+        else:
+            branches.append(re.escape(char) + _trie_pattern(child))
+
+    if singles:
+        branches.append(singles[0] if len(singles) == 1 else '[' + ''.join(singles) + ']')
+    pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    # Greedy optional: prefer the longer rule, fall back to the shorter one
+    if terminal:
+        pattern = '(?:' + pattern + ')?'
+    return pattern
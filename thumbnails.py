@@ -0,0 +1,180 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+
+# Pillow is optional and only imported when a thumbnail is rendered
+HAS_PILLOW = find_spec('PIL') is not None
+
+
+# Formats Pillow cannot rasterize are served as originals
+SKIP_EXTENSIONS = ('.svg',)
+
+
+# Generates downscaled copies of gallery images once, on a worker pool.
+# Thumbnails live either under a derived S3 prefix (mode 's3') or in a local
+# directory served by the app (mode 'local'). An image whose thumbnail could
+# not be generated is not tried again for retry_after seconds.
+#
+# Thumbnails are served as immutable, so their names include the version
+# (ETag) of the object they were made from: an object replaced under the
+# same key gets a new thumbnail and URL. Objects whose version is not known
+# get none.
+class ThumbnailGenerator:
+    def __init__(self, mode, prefix, cache_dir, size, workers, quality=80, retry_after=300):
+        self.mode = mode
+        self.prefix = prefix
+        self.cache_dir = cache_dir
+        self.size = size
+        self.quality = quality
+        self.retry_after = retry_after
+        self.enabled = mode in ('s3', 'local') and HAS_PILLOW
+        self._ready = set()
+        self._pending = set()
+        self._failed = {}  # name -> time.monotonic() after which to retry
+        self._loaded_buckets = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._workers = workers
+
+        if mode in ('s3', 'local') and not HAS_PILLOW:
+            print("WARNING: Pillow is not installed, thumbnails are disabled")
+        if self.enabled and mode == 'local':
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def is_thumbnail_key(self, key):
+        return self.mode == 's3' and key.startswith(self.prefix)
+
+    def thumbnail_name(self, bucket, key, version):
+        if self.mode == 's3':
+            digest = hashlib.sha1(version.encode('utf-8')).hexdigest()[:16]
+            return f"{self.prefix}{key}.{digest}.webp"
+        digest = hashlib.sha1(f"{bucket}/{key}/{version}".encode('utf-8')).hexdigest()
+        return f"{digest}.webp"
+
+    # Whether ready_name can answer without calling S3
+    def ready_known(self, bucket):
+        if self.mode != 's3' or not self.enabled:
+            return True
+        with self._lock:
+            return bucket in self._loaded_buckets
+
+    def ready_name(self, client, bucket, key, version):
+        # Returns the thumbnail name if it already exists, otherwise None
+        if not self.enabled or not version or key.lower().endswith(SKIP_EXTENSIONS):
+            return None
+        self.load_existing(client, bucket)
+        name = self.thumbnail_name(bucket, key, version)
+        with self._lock:
+            if name in self._ready:
+                return name
+        if self.mode == 'local' and os.path.exists(os.path.join(self.cache_dir, name)):
+            with self._lock:
+                self._ready.add(name)
+            return name
+        return None
+
+    # objects is an iterable of (key, version) pairs
+    def schedule(self, client, bucket, objects):
+        if not self.enabled:
+            return
+        for key, version in objects:
+            if not version or key.lower().endswith(SKIP_EXTENSIONS):
+                continue
+            name = self.thumbnail_name(bucket, key, version)
+            with self._lock:
+                if name in self._ready or name in self._pending:
+                    continue
+                if self._failed.get(name, 0) > time.monotonic():
+                    continue
+                self._failed.pop(name, None)
+                self._pending.add(name)
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._workers,
+                        thread_name_prefix='thumbnail'
+                    )
+            self._executor.submit(self._generate, client, bucket, key, name)
+
+    def load_existing(self, client, bucket):
+        # Thumbnails already in the bucket are discovered with one LIST per
+        # process; ones other workers add later are found by _exists
+        if self.mode != 's3' or not self.enabled:
+            return
+        with self._lock:
+            if bucket in self._loaded_buckets:
+                return
+            self._loaded_buckets.add(bucket)
+        try:
+            names = []
+            paginator = client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=bucket, Prefix=self.prefix):
+                names.extend(obj['Key'] for obj in page.get('Contents', []))
+            with self._lock:
+                self._ready.update(names)
+        except Exception as e:
+            print(f"Error listing thumbnails: {e}")
+            with self._lock:
+                self._loaded_buckets.discard(bucket)
+
+    def _exists(self, client, bucket, name):
+        from botocore.exceptions import ClientError
+        try:
+            client.head_object(Bucket=bucket, Key=name)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def _generate(self, client, bucket, key, name):
+        try:
+            # Another worker process may have made it since our LIST
+            if self.mode == 's3' and self._exists(client, bucket, name):
+                with self._lock:
+                    self._ready.add(name)
+                return
+            body = client.get_object(Bucket=bucket, Key=key)['Body'].read()
+            data = self.render(body)
+            if self.mode == 's3':
+                client.put_object(
+                    Bucket=bucket,
+                    Key=name,
+                    Body=data,
+                    ContentType='image/webp',
+                    CacheControl='public, max-age=31536000, immutable'
+                )
+            else:
+                # Unique per process and thread; workers share the directory
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(data)
+                    os.replace(tmp_path, os.path.join(self.cache_dir, name))
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+            with self._lock:
+                self._ready.add(name)
+        except Exception as e:
+            print(f"Error generating thumbnail for {key}: {e}")
+            with self._lock:
+                self._failed[name] = time.monotonic() + self.retry_after
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+
+    def render(self, data):
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            img.thumbnail(self.size)
+            if img.mode not in ('RGB', 'RGBA'):
+                has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+                img = img.convert('RGBA' if has_alpha else 'RGB')
+            out = io.BytesIO()
+            img.save(out, format='WEBP', quality=self.quality)
+            return out.getvalue()
@@ -0,0 +1,303 @@
+# UI text catalog. Kept apart from app.py so build tools (fonts.py) can
+# read it without starting the app.
+
+# 10-language dictionary (no Hebrew)
+LANGUAGES = {
+    'en': {
+        'title': 'Text Processor',
+        'input_label': 'Enter text:',
+        'input_placeholder': 'Type your text here...',
+        'process_button': 'Process',
+        'output_label': 'Processed Text:',
+        'gallery_title': 'S3 Bucket Images:',
+        'no_s3_config': 'Please configure S3_BUCKET_NAME in .env file. Ensure EC2 instance has S3 permissions.',
+        'no_images': 'No images found in the S3 bucket.',
+        'output_placeholder': 'Processing results will appear here.',
+        'load_more': 'Load more',
+        'upload_label': 'Or upload a large text file:',
+        'upload_prompt': 'Drag and drop or click to select a file',
+        'upload_progress': 'Processing… {percent}%',
+        'upload_download': 'Download processed file',
+        'upload_failed': 'Processing failed.',
+        'gallery_loading': 'Loading images…',
+        'gallery_busy': 'The server is busy. Please try again in a moment.',
+        'gallery_failed': 'Could not load the images. Press Refresh to try again.',
+        'gallery_root': 'All images',
+        'search_placeholder': 'Search images by name...',
+        'no_results': 'No images match your search.',
+        'sort_name': 'Name',
+        'sort_newest': 'Newest first',
+        'sort_largest': 'Largest first',
+        'gallery_refresh': 'Refresh'
+    },
+    'ja': {
+        'title': 'テキストプロセッサ',
+        'input_label': 'テキストを入力:',
+        'input_placeholder': 'ここにテキストを入力してください...',
+        'process_button': '処理',
+        'output_label': '処理済みテキスト:',
+        'gallery_title': 'S3 バケット画像:',
+        'no_s3_config': 'S3_BUCKET_NAME を .env ファイルに設定してください。EC2 インスタンスに S3 パーミッションがあることを確認してください。',
+        'no_images': 'S3 バケットに画像が見つかりません。',
+        'output_placeholder': '処理結果がここに表示されます。',
+        'load_more': 'さらに読み込む',
+        'upload_label': '大きなテキストファイルをアップロード:',
+        'upload_prompt': 'ファイルをドラッグ＆ドロップするか、クリックして選択',
+        'upload_progress': '処理中… {percent}%',
+        'upload_download': '処理済みファイルをダウンロード',
+        'upload_failed': '処理に失敗しました。',
+        'gallery_loading': '画像を読み込んでいます…',
+        'gallery_busy': 'サーバーが混み合っています。しばらくしてから再度お試しください。',
+        'gallery_failed': '画像を読み込めませんでした。「更新」を押して再試行してください。',
+        'gallery_root': 'すべての画像',
+        'search_placeholder': '名前で画像を検索...',
+        'no_results': '検索に一致する画像はありません。',
+        'sort_name': '名前順',
+        'sort_newest': '新しい順',
+        'sort_largest': '大きい順',
+        'gallery_refresh': '更新'
+    },
+    'zh': {
+        'title': '文本处理器',
+        'input_label': '输入文本：',
+        'input_placeholder': '在这里输入您的文本...',
+        'process_button': '处理',
+        'output_label': '处理后的文本：',
+        'gallery_title': 'S3 存储桶图片：',
+        'no_s3_config': '请在 .env 文件中配置 S3_BUCKET_NAME。确保 EC2 实例具有 S3 权限。',
+        'no_images': 'S3 存储桶中未找到图片。',
+        'output_placeholder': '处理结果将显示在这里。',
+        'load_more': '加载更多',
+        'upload_label': '或上传大型文本文件：',
+        'upload_prompt': '拖放文件或点击选择',
+        'upload_progress': '处理中… {percent}%',
+        'upload_download': '下载处理后的文件',
+        'upload_failed': '处理失败。',
+        'gallery_loading': '正在加载图片…',
+        'gallery_busy': '服务器繁忙，请稍后再试。',
+        'gallery_failed': '无法加载图片。请点击“刷新”重试。',
+        'gallery_root': '全部图片',
+        'search_placeholder': '按名称搜索图片...',
+        'no_results': '没有与搜索匹配的图片。',
+        'sort_name': '按名称',
+        'sort_newest': '最新优先',
+        'sort_largest': '最大优先',
+        'gallery_refresh': '刷新'
+    },
+    'fr': {
+        'title': 'Processeur de texte',
+        'input_label': 'Entrez du texte :',
+        'input_placeholder': 'Tapez votre texte ici...',
+        'process_button': 'Traiter',
+        'output_label': 'Texte traité :',
+        'gallery_title': 'Images du bucket S3 :',
+        'no_s3_config': 'Veuillez configurer S3_BUCKET_NAME dans le fichier .env. Assurez-vous que l\'instance EC2 a les permissions S3.',
+        'no_images': 'Aucune image trouvée dans le bucket S3.',
+        'output_placeholder': 'Les résultats du traitement apparaîtront ici.',
+        'load_more': 'Charger plus',
+        'upload_label': 'Ou téléversez un fichier texte volumineux :',
+        'upload_prompt': 'Glissez-déposez ou cliquez pour choisir un fichier',
+        'upload_progress': 'Traitement… {percent} %',
+        'upload_download': 'Télécharger le fichier traité',
+        'upload_failed': 'Le traitement a échoué.',
+        'gallery_loading': 'Chargement des images…',
+        'gallery_busy': 'Le serveur est occupé. Veuillez réessayer dans un instant.',
+        'gallery_failed': 'Impossible de charger les images. Cliquez sur Actualiser pour réessayer.',
+        'gallery_root': 'Toutes les images',
+        'search_placeholder': 'Rechercher des images par nom...',
+        'no_results': 'Aucune image ne correspond à votre recherche.',
+        'sort_name': 'Nom',
+        'sort_newest': 'Plus récentes',
+        'sort_largest': 'Plus volumineuses',
+        'gallery_refresh': 'Actualiser'
+    },
+    'pt-BR': {
+        'title': 'Processador de Texto',
+        'input_label': 'Digite o texto:',
+        'input_placeholder': 'Digite seu texto aqui...',
+        'process_button': 'Processar',
+        'output_label': 'Texto Processado:',
+        'gallery_title': 'Imagens do Bucket S3:',
+        'no_s3_config': 'Configure S3_BUCKET_NAME no arquivo .env. Certifique-se de que a instância EC2 tem permissões S3.',
+        'no_images': 'Nenhuma imagem encontrada no bucket S3.',
+        'output_placeholder': 'Os resultados do processamento aparecerão aqui.',
+        'load_more': 'Carregar mais',
+        'upload_label': 'Ou envie um arquivo de texto grande:',
+        'upload_prompt': 'Arraste e solte ou clique para selecionar um arquivo',
+        'upload_progress': 'Processando… {percent}%',
+        'upload_download': 'Baixar arquivo processado',
+        'upload_failed': 'Falha no processamento.',
+        'gallery_loading': 'Carregando imagens…',
+        'gallery_busy': 'O servidor está ocupado. Tente novamente em instantes.',
+        'gallery_failed': 'Não foi possível carregar as imagens. Clique em Atualizar para tentar novamente.',
+        'gallery_root': 'Todas as imagens',
+        'search_placeholder': 'Pesquisar imagens por nome...',
+        'no_results': 'Nenhuma imagem corresponde à sua pesquisa.',
+        'sort_name': 'Nome',
+        'sort_newest': 'Mais recentes',
+        'sort_largest': 'Maiores primeiro',
+        'gallery_refresh': 'Atualizar'
+    },
+    'it': {
+        'title': 'Processore di Testo',
+        'input_label': 'Inserisci testo:',
+        'input_placeholder': 'Digita il tuo testo qui...',
+        'process_button': 'Elabora',
+        'output_label': 'Testo Elaborato:',
+        'gallery_title': 'Immagini Bucket S3:',
+        'no_s3_config': 'Configura S3_BUCKET_NAME nel file .env. Assicurati che l\'istanza EC2 abbia i permessi S3.',
+        'no_images': 'Nessuna immagine trovata nel bucket S3.',
+        'output_placeholder': 'I risultati dell\'elaborazione appariranno qui.',
+        'load_more': 'Carica altro',
+        'upload_label': 'Oppure carica un file di testo di grandi dimensioni:',
+        'upload_prompt': 'Trascina o fai clic per selezionare un file',
+        'upload_progress': 'Elaborazione… {percent}%',
+        'upload_download': 'Scarica il file elaborato',
+        'upload_failed': 'Elaborazione non riuscita.',
+        'gallery_loading': 'Caricamento immagini…',
+        'gallery_busy': 'Il server è occupato. Riprova tra poco.',
+        'gallery_failed': 'Impossibile caricare le immagini. Premi Aggiorna per riprovare.',
+        'gallery_root': 'Tutte le immagini',
+        'search_placeholder': 'Cerca immagini per nome...',
+        'no_results': 'Nessuna immagine corrisponde alla ricerca.',
+        'sort_name': 'Nome',
+        'sort_newest': 'Più recenti',
+        'sort_largest': 'Più grandi',
+        'gallery_refresh': 'Aggiorna'
+    },
+    'ru': {
+        'title': 'Обработчик текста',
+        'input_label': 'Введите текст:',
+        'input_placeholder': 'Введите ваш текст здесь...',
+        'process_button': 'Обработать',
+        'output_label': 'Обработанный текст:',
+        'gallery_title': 'Изображения из S3 бакета:',
+        'no_s3_config': 'Настройте S3_BUCKET_NAME в файле .env. Убедитесь, что EC2 имеет права доступа к S3.',
+        'no_images': 'Изображения в S3 бакете не найдены.',
+        'output_placeholder': 'Результаты обработки появятся здесь.',
+        'load_more': 'Загрузить ещё',
+        'upload_label': 'Или загрузите большой текстовый файл:',
+        'upload_prompt': 'Перетащите файл или нажмите, чтобы выбрать',
+        'upload_progress': 'Обработка… {percent}%',
+        'upload_download': 'Скачать обработанный файл',
+        'upload_failed': 'Ошибка обработки.',
+        'gallery_loading': 'Загрузка изображений…',
+        'gallery_busy': 'Сервер занят. Повторите попытку чуть позже.',
+        'gallery_failed': 'Не удалось загрузить изображения. Нажмите «Обновить», чтобы повторить попытку.',
+        'gallery_root': 'Все изображения',
+        'search_placeholder': 'Поиск изображений по имени...',
+        'no_results': 'Нет изображений, соответствующих запросу.',
+        'sort_name': 'По имени',
+        'sort_newest': 'Сначала новые',
+        'sort_largest': 'Сначала большие',
+        'gallery_refresh': 'Обновить'
+    },
+    'el': {
+        'title': 'Επεξεργαστής Κειμένου',
+        'input_label': 'Εισαγάγετε κείμενο:',
+        'input_placeholder': 'Πληκτρολογήστε το κείμενό σας εδώ...',
+        'process_button': 'Επεξεργασία',
+        'output_label': 'Επεξεργασμένο Κείμενο:',
+        'gallery_title': 'Εικόνες S3 Bucket:',
+        'no_s3_config': 'Ρυθμίστε το S3_BUCKET_NAME στο αρχείο .env. Βεβαιωθείτε ότι η EC2 έχει δικαιώματα S3.',
+        'no_images': 'Δεν βρέθηκαν εικόνες στο S3 bucket.',
+        'output_placeholder': 'Τα αποτελέσματα επεξεργασίας θα εμφανιστούν εδώ.',
+        'load_more': 'Φόρτωση περισσότερων',
+        'upload_label': 'Ή ανεβάστε ένα μεγάλο αρχείο κειμένου:',
+        'upload_prompt': 'Σύρετε και αφήστε ή κάντε κλικ για επιλογή αρχείου',
+        'upload_progress': 'Επεξεργασία… {percent}%',
+        'upload_download': 'Λήψη επεξεργασμένου αρχείου',
+        'upload_failed': 'Η επεξεργασία απέτυχε.',
+        'gallery_loading': 'Φόρτωση εικόνων…',
+        'gallery_busy': 'Ο διακομιστής είναι απασχολημένος. Δοκιμάστε ξανά σε λίγο.',
+        'gallery_failed': 'Δεν ήταν δυνατή η φόρτωση των εικόνων. Πατήστε Ανανέωση για να δοκιμάσετε ξανά.',
+        'gallery_root': 'Όλες οι εικόνες',
+        'search_placeholder': 'Αναζήτηση εικόνων με όνομα...',
+        'no_results': 'Καμία εικόνα δεν ταιριάζει με την αναζήτηση.',
+        'sort_name': 'Όνομα',
+        'sort_newest': 'Νεότερες πρώτα',
+        'sort_largest': 'Μεγαλύτερες πρώτα',
+        'gallery_refresh': 'Ανανέωση'
+    },
+    'ar': {
+        'title': 'معالج النصوص',
+        'input_label': 'أدخل النص:',
+        'input_placeholder': 'اكتب نصك هنا...',
+        'process_button': 'معالجة',
+        'output_label': 'النص المعالج:',
+        'gallery_title': 'صور حاوية S3:',
+        'no_s3_config': 'يرجى تكوين S3_BUCKET_NAME في ملف .env. تأكد من أن مثيل EC2 لديه أذونات S3.',
+        'no_images': 'لم يتم العثور على صور في حاوية S3.',
+        'output_placeholder': 'ستظهر نتائج المعالجة هنا.',
+        'load_more': 'تحميل المزيد',
+        'upload_label': 'أو قم بتحميل ملف نصي كبير:',
+        'upload_prompt': 'اسحب الملف وأفلته أو انقر للاختيار',
+        'upload_progress': 'جارٍ المعالجة… {percent}%',
+        'upload_download': 'تنزيل الملف المعالج',
+        'upload_failed': 'فشلت المعالجة.',
+        'gallery_loading': 'جارٍ تحميل الصور…',
+        'gallery_busy': 'الخادم مشغول. يرجى المحاولة مرة أخرى بعد قليل.',
+        'gallery_failed': 'تعذر تحميل الصور. اضغط على تحديث للمحاولة مرة أخرى.',
+        'gallery_root': 'كل الصور',
+        'search_placeholder': 'ابحث عن الصور بالاسم...',
+        'no_results': 'لا توجد صور تطابق بحثك.',
+        'sort_name': 'الاسم',
+        'sort_newest': 'الأحدث أولاً',
+        'sort_largest': 'الأكبر أولاً',
+        'gallery_refresh': 'تحديث'
+    },
+    'tl': {
+        'title': 'Text Processor',
+        'input_label': 'Ilagay ang teksto:',
+        'input_placeholder': 'I-type ang iyong teksto dito...',
+        'process_button': 'Proseso',
+        'output_label': 'Na-process na Teksto:',
+        'gallery_title': 'Mga Larawan ng S3 Bucket:',
+        'no_s3_config': 'I-configure ang S3_BUCKET_NAME sa .env file. Siguraduhin na ang EC2 instance ay may S3 permissions.',
+        'no_images': 'Walang natagpuang mga larawan sa S3 bucket.',
+        'output_placeholder': 'Dito lalabas ang mga resulta ng pagproseso.',
+        'load_more': 'Mag-load pa',
+        'upload_label': 'O mag-upload ng malaking text file:',
+        'upload_prompt': 'I-drag at i-drop o i-click para pumili ng file',
+        'upload_progress': 'Pinoproseso… {percent}%',
+        'upload_download': 'I-download ang na-process na file',
+        'upload_failed': 'Nabigo ang pagproseso.',
+        'gallery_loading': 'Nilo-load ang mga larawan…',
+        'gallery_busy': 'Abala ang server. Pakisubukang muli mamaya.',
+        'gallery_failed': 'Hindi ma-load ang mga larawan. Pindutin ang I-refresh para subukang muli.',
+        'gallery_root': 'Lahat ng larawan',
+        'search_placeholder': 'Maghanap ng larawan ayon sa pangalan...',
+        'no_results': 'Walang larawang tumutugma sa iyong paghahanap.',
+        'sort_name': 'Pangalan',
+        'sort_newest': 'Pinakabago muna',
+        'sort_largest': 'Pinakamalaki muna',
+        'gallery_refresh': 'I-refresh'
+    },
+    'es': {
+        'title': 'Procesador de Texto',
+        'input_label': 'Ingresa texto:',
+        'input_placeholder': 'Escribe tu texto aquí...',
+        'process_button': 'Procesar',
+        'output_label': 'Texto Procesado:',
+        'gallery_title': 'Imágenes del Bucket S3:',
+        'no_s3_config': 'Configura S3_BUCKET_NAME en el archivo .env. Asegúrate de que la instancia EC2 tenga permisos S3.',
+        'no_images': 'No se encontraron imágenes en el bucket S3.',
+        'output_placeholder': 'Los resultados del procesamiento aparecerán aquí.',
+        'load_more': 'Cargar más',
+        'upload_label': 'O sube un archivo de texto grande:',
+        'upload_prompt': 'Arrastra y suelta o haz clic para seleccionar un archivo',
+        'upload_progress': 'Procesando… {percent}%',
+        'upload_download': 'Descargar archivo procesado',
+        'upload_failed': 'El procesamiento falló.',
+        'gallery_loading': 'Cargando imágenes…',
+        'gallery_busy': 'El servidor está ocupado. Inténtalo de nuevo en un momento.',
+        'gallery_failed': 'No se pudieron cargar las imágenes. Pulsa Actualizar para intentarlo de nuevo.',
+        'gallery_root': 'Todas las imágenes',
+        'search_placeholder': 'Buscar imágenes por nombre...',
+        'no_results': 'Ninguna imagen coincide con tu búsqueda.',
+        'sort_name': 'Nombre',
+        'sort_newest': 'Más recientes',
+        'sort_largest': 'Más grandes',
+        'gallery_refresh': 'Actualizar'
+    }
+}